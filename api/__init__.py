@@ -57,4 +57,8 @@ def create_app(config_class=Config):
     from .routes import bp
     app.register_blueprint(bp)
     
+    # 响应压缩（gzip / brotli）
+    from .services.compression import init_compression
+    init_compression(app)
+    
     return app
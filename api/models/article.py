@@ -1,4 +1,5 @@
 from api import db
+from mongoengine import queryset_manager
 from datetime import datetime
 
 class DailyNewsletter(db.Document):
@@ -7,6 +8,10 @@ class DailyNewsletter(db.Document):
     sections = db.ListField(db.DictField())
     created_at = db.DateTimeField(default=datetime.utcnow)
     generated_title = db.StringField()
+    # partial：采集中，已完成的版块先行发布；complete：全部版块和标题已生成
+    # 旧文档没有该字段，视为 complete
+    status = db.StringField(choices=('partial', 'complete'))
+    updated_at = db.DateTimeField()
     
     meta = {
         'collection': 'newsletters',
@@ -16,14 +21,42 @@ class DailyNewsletter(db.Document):
         ]
     }
     
+    @queryset_manager
+    def complete(doc_cls, queryset):
+        """只包含已完整生成的简报（发送邮件等场景使用）"""
+        return queryset.filter(status__ne='partial')
+    
+    @property
+    def is_complete(self):
+        return self.status != 'partial'
+    
     def to_dict(self):
         return {
             'id': str(self.id),
             'date': self.date.strftime('%Y-%m-%d'),
             'sections': self.sections,
+            'status': 'complete' if self.is_complete else 'partial',
             'created_at': self.created_at.isoformat()
         }
 
+class NewsletterStaging(db.Document):
+    """
+    采集过程中的暂存文档：按文章保存翻译和图片进度，
+    中断后重试只处理未完成的部分（已完成的版块会先以 partial 状态发布到 DailyNewsletter）
+    """
+    date = db.StringField(required=True, unique=True)  # YYYY-MM-DD
+    # key 为文章原文哈希，value 包含 translation/image 状态及结果
+    articles = db.DictField()
+    created_at = db.DateTimeField(default=datetime.utcnow)
+    updated_at = db.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'newsletter_staging',
+        'indexes': [
+            'date'
+        ]
+    }
+
 class Article(db.EmbeddedDocument):
     title = db.StringField(required=True)
     title_en = db.StringField(required=True)
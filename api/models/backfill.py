@@ -0,0 +1,19 @@
+from api import db
+from datetime import datetime
+
+class BackfillCursor(db.Document):
+    """回填进度游标：记录已完成的日期，中断后可从断点继续"""
+    name = db.StringField(required=True, unique=True)
+    task = db.StringField(required=True)
+    start = db.StringField()
+    end = db.StringField()
+    completed = db.ListField(db.StringField())
+    created_at = db.DateTimeField(default=datetime.utcnow)
+    updated_at = db.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'backfill_cursors',
+        'indexes': [
+            'name'
+        ]
+    }
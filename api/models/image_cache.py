@@ -0,0 +1,18 @@
+from api import db
+from datetime import datetime
+
+class CachedImage(db.Document):
+    """文章图片提取结果缓存，expires_at 到期后由 MongoDB TTL 索引自动清除"""
+    url = db.StringField(required=True, unique=True)
+    image_url = db.StringField()  # 为空表示没有图片或提取失败（负缓存）
+    status = db.StringField(choices=('found', 'none', 'error'))
+    checked_at = db.DateTimeField(default=datetime.utcnow)
+    expires_at = db.DateTimeField(required=True)
+    
+    meta = {
+        'collection': 'image_cache',
+        'indexes': [
+            'url',
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0}
+        ]
+    }
@@ -0,0 +1,38 @@
+from api import db
+from datetime import datetime
+
+class IngestJob(db.Document):
+    """简报采集任务，每个日期一条，由 worker.py 领取执行"""
+    STATUSES = ('queued', 'running', 'done', 'empty', 'failed')
+    
+    date = db.StringField(required=True, unique=True)  # YYYY-MM-DD（美东时间）
+    status = db.StringField(choices=STATUSES, default='queued')
+    attempts = db.IntField(default=0)  # 本次入队后被领取的次数（租约过期被重新领取时大于 1），重新入队时清零
+    failures = db.IntField(default=0)  # 连续失败次数，成功或无内容时清零；达到 MAX_ATTEMPTS 后不再自动重新入队
+    error = db.StringField()
+    owner = db.StringField()
+    created_at = db.DateTimeField(default=datetime.utcnow)
+    queued_at = db.DateTimeField(default=datetime.utcnow)
+    started_at = db.DateTimeField()
+    finished_at = db.DateTimeField()
+    lease_until = db.DateTimeField()  # 执行中的任务超过此时间未完成，视为 worker 已崩溃，可被重新领取
+    
+    meta = {
+        'collection': 'ingest_jobs',
+        'indexes': [
+            'date',
+            ('status', 'queued_at')
+        ]
+    }
+    
+    def to_dict(self):
+        return {
+            'date': self.date,
+            'status': self.status,
+            'attempts': self.attempts,
+            'failures': self.failures,
+            'error': self.error,
+            'queued_at': self.queued_at.isoformat() if self.queued_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
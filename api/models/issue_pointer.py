@@ -0,0 +1,20 @@
+from api import db
+from datetime import datetime
+
+class IssuePointer(db.Document):
+    """
+    指向最新一期简报的指针（latest：包括采集中的；latest_complete：只算完整的）
+    采集时更新，读取"最新一期"时无需排序查询
+    archive：任意一期写入（包括回填较早的日期）都会递增 version，date 为最近写入的日期
+    """
+    name = db.StringField(required=True, unique=True)
+    date = db.StringField(required=True)  # YYYY-MM-DD
+    version = db.IntField(default=0)  # 指向的日期或该期内容每次变化时递增
+    updated_at = db.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'issue_pointers',
+        'indexes': [
+            'name'
+        ]
+    }
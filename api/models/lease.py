@@ -0,0 +1,16 @@
+from api import db
+from datetime import datetime
+
+class GenerationLease(db.Document):
+    """跨进程的生成租约：同一个 key 同一时间只有一个持有者，过期后可被抢占"""
+    key = db.StringField(required=True, unique=True)
+    owner = db.StringField(required=True)
+    acquired_at = db.DateTimeField(default=datetime.utcnow)
+    expires_at = db.DateTimeField(required=True)
+    
+    meta = {
+        'collection': 'generation_leases',
+        'indexes': [
+            'key'
+        ]
+    }
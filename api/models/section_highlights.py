@@ -0,0 +1,20 @@
+from api import db
+from datetime import datetime
+
+class SectionHighlights(db.Document):
+    """
+    各版块最新的带图文章（首页 /api/latest-articles-by-section 使用）
+    采集完成时增量更新，接口只需读取这一个小文档
+    """
+    name = db.StringField(required=True, unique=True)
+    # {版块名: [{title, content, url, image_url, date}]}，每个版块按日期从新到旧
+    sections = db.DictField()
+    version = db.IntField(default=0)  # 乐观锁，防止并发更新互相覆盖
+    updated_at = db.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'section_highlights',
+        'indexes': [
+            'name'
+        ]
+    }
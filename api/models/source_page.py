@@ -0,0 +1,18 @@
+from api import db
+from datetime import datetime
+
+class SourcePage(db.Document):
+    """抓取源页面的缓存校验信息，用于条件请求和变更检测"""
+    url = db.StringField(required=True, unique=True)
+    etag = db.StringField()
+    last_modified = db.StringField()
+    content_hash = db.StringField()  # 页面原始内容的 sha256
+    fetched_at = db.DateTimeField(default=datetime.utcnow)
+    changed_at = db.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'source_pages',
+        'indexes': [
+            'url'
+        ]
+    }
@@ -0,0 +1,17 @@
+from api import db
+from datetime import datetime
+
+class CachedTranslation(db.Document):
+    """翻译缓存：key 为 (模型, 提示词版本, 原文) 的哈希"""
+    key = db.StringField(required=True, unique=True)
+    kind = db.StringField()  # title / content
+    model = db.StringField()
+    translated = db.StringField(required=True)
+    created_at = db.DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'translation_cache',
+        'indexes': [
+            'key'
+        ]
+    }
@@ -1,10 +1,9 @@
 from flask import Blueprint, jsonify, request, url_for, current_app, redirect
-from .services.newsletter import get_newsletter, fetch_tldr_content
+from .services.newsletter import get_newsletter, fetch_tldr_content, is_abandoned_partial
 from datetime import datetime
 import pytz
 from datetime import timedelta
-from .services.emoji_mapper import get_section_emoji, clean_reading_time, get_title_emoji
-from .models.article import DailyNewsletter
+from .services.emoji_mapper import display_section, display_title, display_title_en
 import logging
 from flask import make_response
 from .services.mailgun_service import MailgunService
@@ -19,6 +18,21 @@ import json
 from io import BytesIO
 import base64
 from .services.title_generator import TitleGeneratorService
+from .services.jobs import enqueue_ingest, get_job, is_ingestable_date, normalize_date, today_et, ACTIVE_STATUSES
+from .services import llm_limiter
+from .services.translation_cache import translation_cache
+from .services.response_cache import newsletter_cache, wechat_cache, sitemap_cache
+from .services.compression import encoded_response, if_none_match_etag
+from .services.section_highlights import get_section_highlights
+from .services.latest_issue import get_latest_date, get_archive_version
+from .services.repository import (
+    get_issue,
+    get_issues_before,
+    get_first_issue_date,
+    iter_issue_dates,
+    get_confirmed_recipients,
+    count_confirmed_subscribers
+)
 
 bp = Blueprint('main', __name__)
 
@@ -65,36 +79,115 @@ def get_available_dates(days=7):
     
     return dates
 
+# "最新一期"类接口的内容会随新简报入库而变化，只能短时间缓存
+LATEST_CACHE_CONTROL = 'public, max-age=60'
+
+def newsletter_response(newsletter, cache_control=None):
+    """
+    返回某期简报；完整的简报序列化一次后放入响应缓存，
+    部分发布（仍在采集中）的简报不缓存，并且只让客户端短时间缓存，以便读者尽快看到后续完成的版块
+    """
+    response_data = {
+        'currentDate': newsletter.date.strftime('%Y-%m-%d'),
+        'sections': newsletter.sections,
+        'generated_title': newsletter.generated_title,
+        'status': 'complete' if newsletter.is_complete else 'partial'
+    }
+    if not newsletter.is_complete:
+        resp = jsonify(response_data)
+        resp.headers['Cache-Control'] = 'public, max-age=10'
+        return resp
+        
+    body = json.dumps(response_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    cached = newsletter_cache.set(response_data['currentDate'], body, version=newsletter.updated_at)
+    return cached_newsletter_response(response_data['currentDate'], cached, cache_control)
+
+def cached_newsletter_response(date, cached, cache_control=None):
+    """
+    用缓存的字节（或预压缩的变体）构造响应；If-None-Match 匹配时返回 304
+    往期内容不会再变化，允许 CDN 和浏览器长期缓存；当天的简报仍可能随源页面更新，只短时间缓存
+    :param cache_control: 指定时覆盖上述策略（不按日期寻址的接口，例如最新一期）
+    """
+    resp = encoded_response(cached, 'application/json')
+    if cache_control:
+        resp.headers['Cache-Control'] = cache_control
+    elif date < today_et():
+        resp.headers['Cache-Control'] = 'public, max-age=604800, immutable'
+    else:
+        resp.headers['Cache-Control'] = 'public, max-age=60, stale-while-revalidate=300'
+    return resp.make_conditional(request)
+
+def latest_newsletter_response():
+    """
+    用最新一期完整简报作为兜底响应：通过指针定位日期，正文走响应缓存
+    请求的日期与实际内容不同，不能使用长期缓存
+    """
+    latest_date = get_latest_date(complete_only=True)
+    if not latest_date:
+        return None
+        
+    cached = newsletter_cache.get(latest_date)
+    if not cached:
+        newsletter = get_issue(latest_date)
+        if not newsletter:
+            return None
+        body = json.dumps({
+            'currentDate': latest_date,
+            'sections': newsletter.sections,
+            'generated_title': newsletter.generated_title,
+            'status': 'complete'
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        cached = newsletter_cache.set(latest_date, body, version=newsletter.updated_at)
+    return cached_newsletter_response(latest_date, cached, cache_control=LATEST_CACHE_CONTROL)
+
 ########################
 # Core Website Routes  #
 ########################
 
 @bp.route('/api/newsletter/<date>')
 def get_newsletter_by_date(date):
+    # 按日期寻址：往期内容允许长期缓存（immutable）
+    return newsletter_for_date(date)
+
+def newsletter_for_date(date, cache_control=None):
+    """:param cache_control: 覆盖按日期决定的缓存策略，见 cached_newsletter_response"""
+    # 2024-6-4 等写法统一为 YYYY-MM-DD，缓存、数据库和任务队列都以规范日期为键
+    date = normalize_date(date) or date
     try:
-        # 先查询指定日期
-        newsletter = DailyNewsletter.objects(date=date).first()
-        if newsletter:
-            response_data = {
-                'currentDate': newsletter.date.strftime('%Y-%m-%d'),
-                'sections': newsletter.sections,
-                'generated_title': newsletter.generated_title
-            }
-            resp = jsonify(response_data)
-            resp.headers['Cache-Control'] = 'public, max-age=3600, stale-while-revalidate=86400'
-            return resp
+        # 先查进程内响应缓存，命中时无需访问数据库
+        cached = newsletter_cache.get(date)
+        if cached:
+            return cached_newsletter_response(date, cached, cache_control)
             
-        # 如果数据库中没有，尝试获取并保存
-        articles = get_newsletter(date)
+        # 再查询指定日期；部分发布的简报在仍有进程生成时直接返回已完成的版块
+        newsletter = get_issue(date)
+        if newsletter and not is_abandoned_partial(newsletter):
+            return newsletter_response(newsletter, cache_control)
+            
+        # 异步模式：交给后台 worker 生成，返回 202 和任务状态地址
+        if current_app.config.get('ASYNC_INGESTION') and is_ingestable_date(date):
+            job = enqueue_ingest(date)
+            if job and job.status in ACTIVE_STATUSES:
+                resp = jsonify({
+                    'status': job.status,
+                    'currentDate': date,
+                    'statusUrl': url_for('main.get_ingest_job', date=date)
+                })
+                resp.status_code = 202
+                resp.headers['Location'] = url_for('main.get_ingest_job', date=date)
+                resp.headers['Retry-After'] = '5'
+                resp.headers['Cache-Control'] = 'no-store'
+                return resp
+            # 该日期暂无内容或生成失败：与同步模式一样返回最新一期
+            articles = None
+        else:
+            # 如果数据库中没有，尝试获取并保存
+            articles = get_newsletter(date)
         
         # 再次检查数据库，因为 get_newsletter 可能已经保存了数据
-        newsletter = DailyNewsletter.objects(date=date).first()
+        newsletter = get_issue(date)
         if newsletter:
-            return jsonify({
-                'currentDate': newsletter.date.strftime('%Y-%m-%d'),
-                'sections': newsletter.sections,
-                'generated_title': newsletter.generated_title
-            })
+            return newsletter_response(newsletter, cache_control)
             
         # 如果还是没有找到，使用 articles 的数据
         if articles and isinstance(articles, dict) and 'sections' in articles:
@@ -104,14 +197,10 @@ def get_newsletter_by_date(date):
                 'generated_title': articles['generated_title']
             })
             
-        # 如果还是找不到，返回最新的 newsletter
-        latest_newsletter = DailyNewsletter.objects().order_by('-date').first()
-        if latest_newsletter:
-            return jsonify({
-                'currentDate': latest_newsletter.date.strftime('%Y-%m-%d'),
-                'sections': latest_newsletter.sections,
-                'generated_title': latest_newsletter.generated_title
-            })
+        # 如果还是找不到，返回最新的完整 newsletter
+        resp = latest_newsletter_response()
+        if resp:
+            return resp
             
         return jsonify({'error': 'No newsletter available'}), 404
         
@@ -119,18 +208,36 @@ def get_newsletter_by_date(date):
         logging.error(f"Error getting newsletter: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/ingest-jobs/<date>')
+def get_ingest_job(date):
+    date = normalize_date(date) or date
+    try:
+        job = get_job(date)
+        if not job:
+            return jsonify({'error': '未找到该日期的采集任务'}), 404
+            
+        response_data = job.to_dict()
+        if job.status == 'done':
+            response_data['newsletterUrl'] = url_for('main.get_newsletter_by_date', date=date)
+        resp = jsonify(response_data)
+        resp.headers['Cache-Control'] = 'no-store'
+        return resp
+        
+    except Exception as e:
+        logging.error(f"Error getting ingest job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/api/latest-articles')
 def get_latest_articles():
     try:
-        # 获取数据库中最新的 newsletter 日期
-        latest_newsletter = DailyNewsletter.objects().order_by('-date').first()
+        # 通过最新一期指针获取日期，无需排序查询
+        latest_date = get_latest_date()
         
-        if not latest_newsletter:
+        if not latest_date:
             return jsonify({'error': '没有找到可用的 newsletter'}), 404
             
-        # 使用最新日期调用 get_newsletter_by_date
-        latest_date = latest_newsletter.date.strftime('%Y-%m-%d')
-        return get_newsletter_by_date(latest_date)
+        # 使用最新日期获取简报；"最新"会随新一期变化，不能使用按日期的长期缓存
+        return newsletter_for_date(latest_date, cache_control=LATEST_CACHE_CONTROL)
         
     except Exception as e:
         logging.error(f"Error getting latest articles: {str(e)}")
@@ -139,51 +246,8 @@ def get_latest_articles():
 @bp.route('/api/latest-articles-by-section')
 def get_latest_articles_by_section():
     try:
-        # 获取所有newsletter，按日期降序排列
-        all_newsletters = DailyNewsletter.objects().order_by('-date')
-        
-        # 定义我们想要的分区
-        sections_to_show = {
-            'Big Tech & Startups': [],
-            'Science & Futuristic Technology': [],
-            'Programming, Design & Data Science': [],
-            'Miscellaneous': [],
-            'Quick Links': []
-        }
-        
-        # 获取当前时间用于计算相对时间
-        now = datetime.now(pytz.timezone('US/Eastern'))
-        
-        # 遍历所有newsletter
-        for newsletter in all_newsletters:
-            newsletter_date = newsletter.date
-            days_ago = (now.date() - newsletter_date).days
-            
-            # 格式化相对时间
-            if days_ago == 0:
-                relative_time = "今天"
-            elif days_ago == 1:
-                relative_time = "昨天"
-            else:
-                relative_time = f"{days_ago}天前"
-            
-            # 处理每个分区
-            for section in newsletter.sections:
-                section_name = section['section']
-                if section_name in sections_to_show and len(sections_to_show[section_name]) < 5:
-                    # 处理该分区的文章
-                    for article in section['articles']:
-                        if article.get('image_url') and len(sections_to_show[section_name]) < 5:
-                            processed_article = {
-                                'title': get_title_emoji(clean_reading_time(article['title'])),
-                                'content': article['content'],
-                                'url': article['url'],
-                                'image_url': article['image_url'],
-                                'relative_time': relative_time
-                            }
-                            sections_to_show[section_name].append(processed_article)
-        
-        return jsonify(sections_to_show)
+        # 读取采集时维护的各版块最新带图文章视图，relative_time 在这里按当前日期计算
+        return jsonify(get_section_highlights())
         
     except Exception as e:
         logging.error(f"Error in get_latest_articles_by_section: {str(e)}")
@@ -193,6 +257,88 @@ def get_latest_articles_by_section():
 # WeChat Integration   #
 ########################
 
+# 公众号内容不包含的板块
+WECHAT_EXCLUDED_SECTIONS = ('Programming, Design & Data Science', 'Quick Links')
+
+def render_wechat_payload(date, sections, generated_title):
+    """把一期简报渲染成公众号接口的返回内容：扁平化的文章列表、内联样式的 HTML 和第一张图片"""
+    # 创建扁平化的文章列表和 HTML 字符串
+    flattened_articles = []
+    articles_html = []
+    first_image_url = None  # 存储第一张图片的URL
+    
+    # 寻找第一张图片URL
+    for section in sections:
+        if first_image_url:
+            break
+            
+        if section['section'] in WECHAT_EXCLUDED_SECTIONS:
+            continue
+            
+        for article in section['articles']:
+            if article.get('image_url'):
+                first_image_url = article['image_url']
+                break
+    
+    # 处理文章内容
+    for section in sections:
+        if section['section'] in WECHAT_EXCLUDED_SECTIONS:
+            continue
+            
+        section_name = display_section(section)
+        
+        for article in section['articles']:
+            # 处理单篇文章（使用采集时保存的展示字段，旧文档现场计算）
+            title_zh = display_title(article)
+            title_en = display_title_en(article)
+            
+            processed_article = {
+                'title': title_zh,
+                'title_en': title_en,
+                'content': article['content'],
+                'content_en': article['content_en'],
+                'url': article.get('url', ''),
+                'section': section_name,
+                'image_url': article.get('image_url', '')
+            }
+            flattened_articles.append(processed_article)
+            
+            # 创建 HTML 格式的文章
+            
+            # 包含中英文
+            # article_html = f'''<div style="margin-bottom:35px;"><p style="font-size:16px;font-weight:bold;color:#273469;margin-bottom:5px;text-decoration:underline;">{title_zh}</p><p style="font-size:15px;color:#30343f;margin-bottom:15px;font-style:italic;">{title_en}</p><p style="font-size:15px;color:#1e2749;line-height:1.6;margin-bottom:8px;">{article['content']}</p><div style="background-color:#f8f8f8;padding:10px;margin-bottom:12px;"><p style="font-size:12px;color:#666;line-height:1.6;font-style:italic;">{article['content_en']}</p></div><p style="font-size:10px;color:#1e88e5;margin-bottom:20px;">{article.get('url', '')}</p></div>'''
+
+            # 只包含中文
+            article_html = f'''<div style="margin-bottom:35px;"><p style="font-size:18px;font-weight:bold;color:#c0392b;margin-bottom:5px;">{title_zh}</p><p style="font-size:15px;color:#1e2749;line-height:1.6;margin-bottom:8px;">{article['content']}</p></div>'''
+            articles_html.append(article_html)
+    
+    # 将所有 HTML 文章组合成一个字符串
+    articles_in_html = ''.join(articles_html)
+    
+    return {
+        'articles': flattened_articles,
+        'currentDate': date,
+        'generated_title': generated_title,
+        'articles_in_html': articles_in_html,
+        'first_image_url': first_image_url  # 返回第一张图片的URL
+    }
+
+def cached_wechat_payload(date):
+    """
+    已完整入库的简报按版本（updated_at）渲染一次，序列化后的字节放入 wechat_cache；
+    发布工具反复轮询同一天时直接命中缓存，不再读取数据库或触发采集
+    """
+    cached = wechat_cache.get(date)
+    if cached:
+        return cached
+        
+    newsletter = get_issue(date, complete_only=True)
+    if not newsletter:
+        return None
+    payload = render_wechat_payload(date, newsletter.sections, newsletter.generated_title or '今日新闻')
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return wechat_cache.set(date, body, version=newsletter.updated_at)
+
 @bp.route('/api/wechat/newsletter/<date>')
 def get_wechat_newsletter(date):
     try:
@@ -200,9 +346,14 @@ def get_wechat_newsletter(date):
         et = pytz.timezone('US/Eastern')
         date_obj = datetime.strptime(date, '%Y-%m-%d')
         date_et = et.localize(date_obj)
+        date = date_et.strftime('%Y-%m-%d')
+        
+        cached = cached_wechat_payload(date)
+        if cached:
+            return cached_newsletter_response(date, cached)
         
-        # 使用美东时间的日期获取新闻
-        articles = get_newsletter(date_et.strftime('%Y-%m-%d'))
+        # 数据库中还没有完整的简报：使用美东时间的日期获取新闻（可能触发采集）
+        articles = get_newsletter(date)
         
         if not articles:
             logging.warning(f"No content available for date: {date} ET")
@@ -212,81 +363,36 @@ def get_wechat_newsletter(date):
                 'currentDate': date,
                 'generated_title': "错误，没找到title"
             }), 404
-        
-        # 获取 sections 和 generated_title
-        sections = articles.get('sections', [])
-        generated_title = articles.get('generated_title', '今日新闻')
-        
-        # 需要排除的板块
-        excluded_sections = ['Programming, Design & Data Science', 'Quick Links']
-        
-        # 创建扁平化的文章列表和 HTML 字符串
-        flattened_articles = []
-        articles_html = []
-        first_image_url = None  # 存储第一张图片的URL
-        
-        # 寻找第一张图片URL
-        for section in sections:
-            if first_image_url:
-                break
-                
-            if section['section'] in excluded_sections:
-                continue
-                
-            for article in section['articles']:
-                if article.get('image_url'):
-                    first_image_url = article['image_url']
-                    break
-        
-        # 处理文章内容
-        for section in sections:
-            if section['section'] in excluded_sections:
-                continue
-                
-            section_name = get_section_emoji(section['section'])
             
-            for article in section['articles']:
-                # 处理单篇文章
-                title_zh = clean_reading_time(article['title'])
-                title_en = clean_reading_time(article['title_en'])
-                title_zh = get_title_emoji(title_zh)
-                
-                processed_article = {
-                    'title': title_zh,
-                    'title_en': clean_reading_time(article['title_en']),
-                    'content': article['content'],
-                    'content_en': article['content_en'],
-                    'url': article.get('url', ''),
-                    'section': section_name,
-                    'image_url': article.get('image_url', '')
-                }
-                flattened_articles.append(processed_article)
-                
-                # 创建 HTML 格式的文章
-                
-                # 包含中英文
-                # article_html = f'''<div style="margin-bottom:35px;"><p style="font-size:16px;font-weight:bold;color:#273469;margin-bottom:5px;text-decoration:underline;">{title_zh}</p><p style="font-size:15px;color:#30343f;margin-bottom:15px;font-style:italic;">{title_en}</p><p style="font-size:15px;color:#1e2749;line-height:1.6;margin-bottom:8px;">{article['content']}</p><div style="background-color:#f8f8f8;padding:10px;margin-bottom:12px;"><p style="font-size:12px;color:#666;line-height:1.6;font-style:italic;">{article['content_en']}</p></div><p style="font-size:10px;color:#1e88e5;margin-bottom:20px;">{article.get('url', '')}</p></div>'''
-
-                # 只包含中文
-                article_html = f'''<div style="margin-bottom:35px;"><p style="font-size:18px;font-weight:bold;color:#c0392b;margin-bottom:5px;">{title_zh}</p><p style="font-size:15px;color:#1e2749;line-height:1.6;margin-bottom:8px;">{article['content']}</p></div>'''
-                articles_html.append(article_html)
+        # 仍在采集中的简报不生成公众号内容，避免发布不完整的文章
+        if articles.get('status') == 'partial':
+            resp = jsonify({
+                'error': f'{date} 的新闻仍在生成中，请稍后重试',
+                'articles': [],
+                'currentDate': date,
+                'generated_title': None
+            })
+            resp.status_code = 503
+            resp.headers['Retry-After'] = '30'
+            return resp
         
-        # 将所有 HTML 文章组合成一个字符串
-        articles_in_html = ''.join(articles_html)
+        # 刚采集完成的简报已经入库，渲染并缓存
+        cached = cached_wechat_payload(date)
+        if cached:
+            return cached_newsletter_response(date, cached)
         
-        return jsonify({
-            'articles': flattened_articles,
-            'currentDate': date,
-            'generated_title': generated_title,
-            'articles_in_html': articles_in_html,
-            'first_image_url': first_image_url  # 返回第一张图片的URL
-        })
+        # 返回的是兜底的最新一期（或保存失败），内容与请求的日期不对应，不缓存
+        return jsonify(render_wechat_payload(
+            date,
+            articles.get('sections', []),
+            articles.get('generated_title', '今日新闻')
+        ))
         
     except Exception as e:
         logging.error(f"Error in get_wechat_newsletter: {str(e)}")
         return jsonify({
             'error': '获取新闻内容时发生错误，请稍后重试',
-            'articles': flattened_articles,
+            'articles': [],
             'currentDate': date,
             'generated_title': '获取新闻失败',
             'articles_in_html': '',
@@ -506,7 +612,8 @@ def unsubscribe(subscriber_id):
 @bp.route('/api/test/send_newsletter', methods=['POST'])
 def test_send_newsletter():
     try:
-        latest_newsletter = DailyNewsletter.objects.order_by('-date').first()
+        latest_date = get_latest_date(complete_only=True)
+        latest_newsletter = get_issue(latest_date) if latest_date else None
         
         if not latest_newsletter:
             return jsonify({'error': '没有找到可用的 newsletter'}), 404
@@ -548,15 +655,16 @@ def send_daily_newsletter_api():
         if api_key != current_app.config.get('NEWSLETTER_API_KEY'):
             return jsonify({'error': '未授权的请求'}), 401
             
-        # 获取最新的 newsletter
-        latest_newsletter = DailyNewsletter.objects.order_by('-date').first()
+        # 获取最新的完整 newsletter（采集中的部分发布内容不发送）
+        latest_date = get_latest_date(complete_only=True)
+        latest_newsletter = get_issue(latest_date) if latest_date else None
         
         if not latest_newsletter:
             return jsonify({'error': '没有找到可用的 newsletter'}), 404
             
-        # 获取所有已确认的订阅者
-        confirmed_subscribers = Subscriber.objects(confirmed=True).all()
-        subscriber_emails = [s.email for s in confirmed_subscribers]
+        # 获取所有已确认的订阅者（邮箱和 id 一次查出，发送时无需逐个查询）
+        subscriber_ids = get_confirmed_recipients()
+        subscriber_emails = list(subscriber_ids)
         
         if not subscriber_emails:
             return jsonify({'message': '没有已确认的订阅者'}), 200
@@ -576,7 +684,8 @@ def send_daily_newsletter_api():
         response = mailgun.send_daily_newsletter(
             subscriber_emails,
             subject,
-            html_content
+            html_content,
+            subscriber_ids=subscriber_ids
         )
         
         return jsonify({
@@ -597,7 +706,7 @@ def send_daily_newsletter_api():
 def get_subscriber_count():
     try:
         # 获取已确认的订阅者数量
-        confirmed_subscribers_count = Subscriber.objects(confirmed=True).count()
+        confirmed_subscribers_count = count_confirmed_subscribers()
         base_count = 4738  # 基础数量
         total_count = base_count + confirmed_subscribers_count
         
@@ -614,11 +723,16 @@ def get_subscriber_count():
         }), 500
     
     
+# 首页精选文章从最近几期中挑选
+FEATURED_ISSUES = 3
+
 @bp.route('/api/featured-news', methods=['GET'])
 def get_featured_news():
     try:
-        # 获取最近的几期 newsletter（多获取几期以便筛选有图片的文章）
-        latest_newsletters = DailyNewsletter.objects.order_by('-date').limit(3)
+        # 获取最近的几期 newsletter（多获取几期以便筛选有图片的文章）：
+        # 由最新一期指针确定日期范围，按日期等值查询，无需对整个集合排序
+        latest_date = get_latest_date()
+        latest_newsletters = get_issues_before(latest_date, FEATURED_ISSUES) if latest_date else []
         
         if not latest_newsletters:
             return jsonify({'error': '没有找到最新内容'}), 404
@@ -692,51 +806,126 @@ def get_featured_news():
         }), 500
 
 
+@bp.route('/api/metrics/llm', methods=['GET'])
+def get_llm_metrics():
+    try:
+        api_key = request.headers.get('X-API-Key')
+        if api_key != current_app.config.get('NEWSLETTER_API_KEY'):
+            return jsonify({'error': '未授权的请求'}), 401
+            
+        resp = jsonify({
+            'llm': llm_limiter.metrics(),
+            'translation_cache': translation_cache.stats()
+        })
+        resp.headers['Cache-Control'] = 'no-store'
+        return resp
+        
+    except Exception as e:
+        logging.error(f"Error getting LLM metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 ########################
 # SEO Routes           #
 ########################
 
+SITEMAP_BASE_URL = 'https://tldrnewsletter.cn'
+SITEMAP_XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+SITEMAP_URLSET = (SITEMAP_XML_HEADER + f'<urlset xmlns="{SITEMAP_NS}">\n', '</urlset>')
+SITEMAP_INDEX = (SITEMAP_XML_HEADER + f'<sitemapindex xmlns="{SITEMAP_NS}">\n', '</sitemapindex>')
+
+def sitemap_response(name, entries, document=SITEMAP_URLSET):
+    """
+    返回 sitemap：ETag 由归档版本生成，任意一期写入（包括回填较早的日期）前内容不变。
+    sitemap_cache 中有当前版本时直接发送（含预压缩的变体）；
+    否则先从游标读完全部条目再响应（单个文件最多一年的日期，大小有上限，与简报总数无关），
+    数据库出错时由调用方返回 500，不会发出带 ETag 的残缺内容
+    :param entries: 返回各条 <url> / <sitemap> 的可迭代对象的函数，只在需要生成时调用
+    """
+    version = get_archive_version()
+    etag = f"sitemap-{name}-{version}"
+    cached = sitemap_cache.get(name)
+    if not cached:
+        # 客户端已有同一版本（任一编码的表示）时直接返回 304，不查询数据库
+        matched = if_none_match_etag(etag)
+        if matched:
+            resp = make_response('', 304)
+            resp.set_etag(matched)
+            resp.vary.add('Accept-Encoding')
+            resp.headers['Cache-Control'] = 'public, max-age=3600'
+            return resp
+            
+        header, footer = document
+        body = header + ''.join(entries()) + footer
+        cached = sitemap_cache.set(name, body.encode('utf-8'), version=version)
+        
+    resp = encoded_response(cached, 'application/xml', etag)
+    resp.headers['Cache-Control'] = 'public, max-age=3600'
+    return resp.make_conditional(request)
+
+def sitemap_error(name, document, error):
+    """生成失败：返回空文档和 500，不带 ETag，也不允许缓存"""
+    logging.error(f"Error generating sitemap {name}: {str(error)}")
+    resp = make_response(''.join(document), 500)
+    resp.mimetype = 'application/xml'
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+def sitemap_years():
+    """有简报的年份范围（从新到旧），每年一个子 sitemap，单个文件远低于 50,000 个 URL 的上限"""
+    latest_date = get_latest_date()
+    first_date = get_first_issue_date()
+    if not latest_date or not first_date:
+        return []
+    return list(range(int(latest_date[:4]), int(first_date[:4]) - 1, -1))
+
+def sitemap_url(loc, changefreq, priority, lastmod=None):
+    lastmod_tag = f'    <lastmod>{lastmod}</lastmod>\n' if lastmod else ''
+    return (
+        f'  <url>\n'
+        f'    <loc>{loc}</loc>\n'
+        f'{lastmod_tag}'
+        f'    <changefreq>{changefreq}</changefreq>\n'
+        f'    <priority>{priority}</priority>\n'
+        f'  </url>\n'
+    )
+
 @bp.route('/api/sitemap.xml')
 def sitemap():
+    """sitemap 索引：首页一个子 sitemap，往期简报按年份分成多个子 sitemap"""
     try:
-        base_url = 'https://tldrnewsletter.cn'
-        newsletters = DailyNewsletter.objects().order_by('-date').only('date')
+        def entries():
+            for name in ['pages'] + [str(year) for year in sitemap_years()]:
+                yield f'  <sitemap>\n    <loc>{SITEMAP_BASE_URL}/api/sitemap-{name}.xml</loc>\n  </sitemap>\n'
+                
+        return sitemap_response('index', entries, SITEMAP_INDEX)
+        
+    except Exception as e:
+        return sitemap_error('index', SITEMAP_INDEX, e)
 
-        urls = []
+@bp.route('/api/sitemap-pages.xml')
+def sitemap_pages():
+    try:
         # Homepage
-        urls.append(
-            f'  <url>\n'
-            f'    <loc>{base_url}/</loc>\n'
-            f'    <changefreq>daily</changefreq>\n'
-            f'    <priority>1.0</priority>\n'
-            f'  </url>'
-        )
-
-        # Newsletter pages
-        for nl in newsletters:
-            date_str = nl.date.strftime('%Y-%m-%d')
-            urls.append(
-                f'  <url>\n'
-                f'    <loc>{base_url}/newsletter/{date_str}</loc>\n'
-                f'    <lastmod>{date_str}</lastmod>\n'
-                f'    <changefreq>never</changefreq>\n'
-                f'    <priority>0.8</priority>\n'
-                f'  </url>'
-            )
-
-        xml = (
-            '<?xml version="1.0" encoding="UTF-8"?>\n'
-            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-            + '\n'.join(urls) +
-            '\n</urlset>'
-        )
-
-        response = make_response(xml)
-        response.headers['Content-Type'] = 'application/xml'
-        response.headers['Cache-Control'] = 'public, max-age=3600'
-        return response
+        return sitemap_response('pages', lambda: [
+            sitemap_url(f'{SITEMAP_BASE_URL}/', 'daily', '1.0')
+        ])
+        
+    except Exception as e:
+        return sitemap_error('pages', SITEMAP_URLSET, e)
 
+@bp.route('/api/sitemap-<int:year>.xml')
+def sitemap_year(year):
+    try:
+        # Newsletter pages：从只取 date 字段的游标逐条生成
+        start, end = f'{year}-01-01', f'{year + 1}-01-01'
+        return sitemap_response(str(year), lambda: (
+            sitemap_url(f'{SITEMAP_BASE_URL}/newsletter/{date_str}', 'never', '0.8', lastmod=date_str)
+            for date_str in iter_issue_dates(start, end)
+        ))
+        
     except Exception as e:
-        logging.error(f"Error generating sitemap: {str(e)}")
-        return make_response('<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"></urlset>'), 500
+        return sitemap_error(str(year), SITEMAP_URLSET, e)
 
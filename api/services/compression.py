@@ -0,0 +1,129 @@
+"""
+响应压缩
+- 缓存的响应（往期简报、公众号内容、sitemap）在写入缓存时压缩一次，
+  gzip / brotli 变体与原始字节一起保存，请求时按 Accept-Encoding 直接选用
+- 其他响应在 after_request 中按需压缩，只处理超过 COMPRESS_MIN_BYTES 的文本类响应
+安装了 brotli（requirements-optional.txt）时同时提供 br，否则只提供 gzip
+"""
+import gzip
+import os
+from flask import request, make_response
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# 小于该大小的响应压缩收益不大，按需压缩时跳过
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+# 预压缩只做一次，使用最高压缩率；按需压缩在每次请求时执行，使用较快的级别
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+DYNAMIC_GZIP_LEVEL = 6
+DYNAMIC_BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/xml',
+    'application/javascript',
+    'text/html',
+    'text/plain',
+    'text/xml',
+    'text/css'
+}
+
+def available_encodings():
+    """当前环境支持的编码，压缩率高的在前"""
+    encodings = []
+    if HAS_BROTLI:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+def compress(body, encoding, precompress=False):
+    if encoding == 'br':
+        quality = PRECOMPRESS_BROTLI_QUALITY if precompress else DYNAMIC_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = PRECOMPRESS_GZIP_LEVEL if precompress else DYNAMIC_GZIP_LEVEL
+    # mtime=0 让相同内容的压缩结果保持一致
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def compress_variants(body):
+    """预压缩：{编码: 压缩后的字节}，只保留比原始内容小的变体"""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return {}
+    variants = {}
+    for encoding in available_encodings():
+        compressed = compress(body, encoding, precompress=True)
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+def negotiate_encoding(encodings):
+    """按请求的 Accept-Encoding 从 encodings 中选择 q 值最高的编码，相同时取靠前的，都不接受时返回 None"""
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def representation_etag(etag, encoding=None):
+    """不同编码是不同的表示，强 ETag 加上编码后缀，条件请求仍可匹配各自的版本"""
+    return f"{etag}-{encoding}" if encoding else etag
+
+def if_none_match_etag(etag):
+    """If-None-Match 命中了 etag 的哪个表示（原始内容或某个编码的变体），都没有命中时返回 None"""
+    for encoding in [None] + available_encodings():
+        candidate = representation_etag(etag, encoding)
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+def encoded_response(cached, mimetype, etag=None):
+    """
+    用缓存条目构造响应，客户端接受时直接发送预压缩的变体（ETag 见 representation_etag）
+    """
+    etag = etag or cached.etag
+    encoding = negotiate_encoding([e for e in available_encodings() if e in cached.variants])
+    if encoding:
+        resp = make_response(cached.variants[encoding])
+        resp.headers['Content-Encoding'] = encoding
+    else:
+        resp = make_response(cached.body)
+    resp.mimetype = mimetype
+    resp.set_etag(representation_etag(etag, encoding))
+    if cached.variants:
+        resp.vary.add('Accept-Encoding')
+    return resp
+
+def compress_response(response):
+    """after_request：按需压缩足够大的文本类响应"""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or 'Accept-Encoding' in response.vary  # 已经协商过编码（预压缩的缓存响应）
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(available_encodings())
+    if not encoding:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(representation_etag(etag, encoding), weak)
+    return response
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 SECTION_EMOJI_MAP = {
     'Big Tech': '🏢',
@@ -134,41 +135,106 @@ TITLE_KEYWORD_EMOJI_MAP = {
     '巴西': '🇧🇷'
 }
 
+def _compile_keyword_matcher(keyword_map):
+    """
+    导入时预处理关键词表：key 预先转小写并按字典顺序去重，
+    匹配时标题只转一次小写，再按优先级做子串查找，结果与原来逐个 key.lower() in title.lower() 一致
+    """
+    matcher = {}
+    for key, emoji in keyword_map.items():
+        matcher.setdefault(key.lower(), emoji)
+    return tuple(matcher.items())
+
+_SECTION_MATCHER = _compile_keyword_matcher(SECTION_EMOJI_MAP)
+_TITLE_MATCHER = _compile_keyword_matcher(TITLE_KEYWORD_EMOJI_MAP)
+
+def _match_emoji(matcher, text):
+    lowered = text.lower()
+    for key, emoji in matcher:
+        if key in lowered:
+            return emoji
+    return None
+
+def _has_emoji(text):
+    return any(ord(c) > 0x1F000 for c in text)
+
+@lru_cache(maxsize=4096)
 def get_section_emoji(section_title):
-    if any(ord(c) > 0x1F000 for c in section_title):
+    if _has_emoji(section_title):
         return section_title
     
-    for key, emoji in SECTION_EMOJI_MAP.items():
-        if key.lower() in section_title.lower():
-            return f"{emoji} {section_title}"
-    return section_title
+    emoji = _match_emoji(_SECTION_MATCHER, section_title)
+    return f"{emoji} {section_title}" if emoji else section_title
 
+@lru_cache(maxsize=4096)
 def get_title_emoji(title):
-    if any(ord(c) > 0x1F000 for c in title):
+    if _has_emoji(title):
         return title
         
-    for key, emoji in TITLE_KEYWORD_EMOJI_MAP.items():
-        if key.lower() in title.lower():
-            return f"{emoji} {title}"
-    return title
+    emoji = _match_emoji(_TITLE_MATCHER, title)
+    return f"{emoji} {title}" if emoji else title
 
+# 更全面的正则表达式，匹配多种格式（按顺序依次应用）；
+# 每个模式附带它必须包含的字符，标题中没有该字符时跳过，省去大多数标题的正则匹配
+_READING_TIME_PATTERNS = [
+    ('(', re.compile(r'\s*\([0-9]+ (?:minute|分钟).*?\)')),  # (5 minute read) 或 (5 分钟阅读)
+    ('（', re.compile(r'\s*\（[0-9]+ (?:minute|分钟).*?\）')),  # （5 minute read）或（5 分钟阅读）- 中文括号
+    ('(', re.compile(r'\s*\([0-9]+(?:m|min).*?\)')),  # (5m read) 或 (5min read)
+    ('（', re.compile(r'\s*\（[0-9]+(?:m|min).*?\）')),  # （5m read）或（5min read）
+    ('分钟', re.compile(r'\s*[（(][0-9]+ ?分钟(?:阅读)?[)）]')),  # (5分钟) 或 （5分钟阅读）
+    ('（', re.compile(r'\s*（.*?(?:分钟|minute).*?）')),  # 匹配任何包含"分钟"或"minute"的中文括号内容
+    ('(', re.compile(r'\s*\(.*?(?:分钟|minute).*?\)')),  # 匹配任何包含"分钟"或"minute"的英文括号内容
+]
+
+@lru_cache(maxsize=4096)
 def clean_reading_time(title):
     if not title:
         return title
         
-    # 更全面的正则表达式，匹配多种格式：
-    patterns = [
-        r'\s*\([0-9]+ (?:minute|分钟).*?\)',  # (5 minute read) 或 (5 分钟阅读)
-        r'\s*\（[0-9]+ (?:minute|分钟).*?\）',  # （5 minute read）或（5 分钟阅读）- 中文括号
-        r'\s*\([0-9]+(?:m|min).*?\)',  # (5m read) 或 (5min read)
-        r'\s*\（[0-9]+(?:m|min).*?\）',  # （5m read）或（5min read）
-        r'\s*[（(][0-9]+ ?分钟(?:阅读)?[)）]',  # (5分钟) 或 （5分钟阅读）
-        r'\s*（.*?(?:分钟|minute).*?）',  # 匹配任何包含"分钟"或"minute"的中文括号内容
-        r'\s*\(.*?(?:分钟|minute).*?\)',  # 匹配任何包含"分钟"或"minute"的英文括号内容
-    ]
-    
-    # 依次应用所有模式
-    for pattern in patterns:
-        title = re.sub(pattern, '', title)
+    # 依次应用所有模式（替换只会删除字符，前面缺少的字符后面也不会出现）
+    for required, pattern in _READING_TIME_PATTERNS:
+        if required in title:
+            title = pattern.sub('', title)
     
-    return title.strip()  # 移除可能残留的首尾空格 
\ No newline at end of file
+    return title.strip()  # 移除可能残留的首尾空格
+
+# 采集时随文章一起保存的展示字段（结果只取决于标题，不必每次请求重新计算）
+def article_display_fields(article):
+    return {
+        'title_en_clean': clean_reading_time(article.get('title_en', '')),
+        'title_emoji': get_title_emoji(clean_reading_time(article['title']))
+    }
+
+def add_display_fields(sections):
+    """返回附带展示字段的 sections：版块加 section_emoji，文章加去掉阅读时长的英文标题和带 emoji 的中文标题"""
+    return [
+        {
+            **section,
+            'section_emoji': get_section_emoji(section['section']),
+            'articles': [{**article, **article_display_fields(article)} for article in section['articles']]
+        }
+        for section in sections
+    ]
+
+def missing_display_fields(sections):
+    """旧文档缺少的展示字段，返回 {字段路径: 值}，用于 $set"""
+    updates = {}
+    for i, section in enumerate(sections):
+        if 'section_emoji' not in section:
+            updates[f'sections.{i}.section_emoji'] = get_section_emoji(section['section'])
+        for j, article in enumerate(section['articles']):
+            for field, value in article_display_fields(article).items():
+                if article.get(field) != value:
+                    updates[f'sections.{i}.articles.{j}.{field}'] = value
+    return updates
+
+# 读取时优先使用已保存的展示字段，旧文档没有时再计算
+def display_section(section):
+    return section.get('section_emoji') or get_section_emoji(section['section'])
+
+def display_title(article):
+    return article.get('title_emoji') or get_title_emoji(clean_reading_time(article['title']))
+
+def display_title_en(article):
+    title_en = article.get('title_en_clean')
+    return title_en if title_en is not None else clean_reading_time(article['title_en'])
@@ -0,0 +1,39 @@
+"""
+HTML 解析后端选择
+抓取代码统一通过 make_soup 创建 BeautifulSoup：
+安装了 lxml（requirements-optional.txt）时使用更快的 lxml 后端，否则回退到内置的 html.parser。
+两种后端使用同一套选择器，结果应保持一致（见 scripts/bench_html_parser.py）
+"""
+import logging
+import os
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+PORTABLE_PARSER = 'html.parser'
+
+def available_parsers():
+    """当前环境可用的解析后端，最快的在前"""
+    parsers = []
+    if HAS_LXML:
+        parsers.append('lxml')
+    parsers.append(PORTABLE_PARSER)
+    return parsers
+
+def _default_parser():
+    # HTML_PARSER 可强制指定后端（例如排查差异时使用 html.parser）
+    preferred = os.environ.get('HTML_PARSER')
+    if preferred:
+        if preferred in available_parsers():
+            return preferred
+        logging.warning(f"HTML parser {preferred} is not available, falling back")
+    return available_parsers()[0]
+
+DEFAULT_PARSER = _default_parser()
+
+def make_soup(markup, parser=None):
+    return BeautifulSoup(markup, parser or DEFAULT_PARSER)
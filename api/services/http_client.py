@@ -0,0 +1,174 @@
+"""
+共享的出站 HTTP 客户端
+所有对外请求（tldr.tech、文章页面、Mailgun）都通过这里发出：
+- 一个进程内共享的 requests.Session，按主机复用连接池并保持长连接
+- 统一的默认超时
+- 基于 tenacity 的指数退避重试
+- HTTP_HOST_OVERRIDES 可把指定主机改写到本地替身服务器，用于基准测试
+"""
+import logging
+import os
+import threading
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    Retrying,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential
+)
+
+# 缓存多少个主机的连接池
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 32))
+# 每个主机最多保持的连接数（应不小于采集线程数）
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 16))
+# 默认超时（秒）
+HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', 10))
+# 最多尝试次数（包括第一次）
+HTTP_MAX_ATTEMPTS = int(os.environ.get('HTTP_MAX_ATTEMPTS', 3))
+
+# 每个主机的最大并发请求数（0 表示不限制），用于批量回填时避免压垮同一个站点
+HTTP_MAX_PER_HOST = int(os.environ.get('HTTP_MAX_PER_HOST', 0))
+
+# 这些状态码通常是暂时性的，值得重试
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+_session = None
+_session_lock = threading.Lock()
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def _parse_host_overrides(value):
+    """
+    解析 HTTP_HOST_OVERRIDES，例如：
+    tldr.tech=http://127.0.0.1:8001,api.mailgun.net=http://127.0.0.1:8003,*=http://127.0.0.1:8002
+    "*" 匹配所有未单独列出的主机
+    """
+    overrides = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        host, target = item.split('=', 1)
+        overrides[host.strip().lower()] = target.strip().rstrip('/')
+    return overrides
+
+HOST_OVERRIDES = _parse_host_overrides(os.environ.get('HTTP_HOST_OVERRIDES'))
+
+def get_session():
+    """获取进程内共享的 Session（懒加载，线程安全）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+def reset_session():
+    """关闭并丢弃共享 Session（例如修改了主机改写配置之后）"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+def set_host_overrides(overrides):
+    """在运行时替换主机改写规则，基准测试脚本使用"""
+    HOST_OVERRIDES.clear()
+    HOST_OVERRIDES.update({host.lower(): target.rstrip('/') for host, target in overrides.items()})
+
+def set_max_per_host(limit):
+    """在运行时修改每主机并发上限（0 表示不限制）"""
+    global HTTP_MAX_PER_HOST
+    with _host_semaphores_lock:
+        HTTP_MAX_PER_HOST = limit
+        _host_semaphores.clear()
+
+def _host_semaphore(url):
+    if HTTP_MAX_PER_HOST <= 0:
+        return None
+    host = (urlsplit(url).hostname or '').lower()
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(HTTP_MAX_PER_HOST)
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+def _apply_host_override(url, headers):
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    target = HOST_OVERRIDES.get(host) or HOST_OVERRIDES.get('*')
+    if not target:
+        return url, headers
+
+    target_parts = urlsplit(target)
+    rewritten = urlunsplit((target_parts.scheme, target_parts.netloc, parts.path, parts.query, parts.fragment))
+    # 保留原始 Host，替身服务器据此区分不同站点
+    headers = dict(headers or {})
+    headers.setdefault('Host', parts.netloc)
+    return rewritten, headers
+
+def _give_up(retry_state):
+    """重试用尽：异常则抛出，状态码不理想则返回最后一次响应交给调用方判断"""
+    outcome = retry_state.outcome
+    if outcome.failed:
+        raise outcome.exception()
+    return outcome.result()
+
+def request(method, url, max_attempts=None, **kwargs):
+    """
+    发送请求，带默认超时和重试
+    - GET 等幂等请求：连接错误、超时和 429/5xx 都会重试
+    - POST 等非幂等请求：只在连接未建立或收到 429 时重试，避免重复发送（例如重复发邮件）
+    """
+    method = method.upper()
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    # 按原始主机限流（在改写到替身服务器之前）
+    semaphore = _host_semaphore(url)
+    url, headers = _apply_host_override(url, kwargs.pop('headers', None))
+    if headers is not None:
+        kwargs['headers'] = headers
+
+    if method in IDEMPOTENT_METHODS:
+        retry_exceptions = (requests.ConnectionError, requests.Timeout)
+        retry_statuses = RETRY_STATUS_CODES
+    else:
+        retry_exceptions = (requests.exceptions.ConnectTimeout,)
+        retry_statuses = {429}
+
+    def _bad_status(response):
+        if response.status_code in retry_statuses:
+            logging.warning(f"HTTP {response.status_code} from {url}, retrying")
+            response.close()
+            return True
+        return False
+
+    session = get_session()
+    retrying = Retrying(
+        stop=stop_after_attempt(max_attempts or HTTP_MAX_ATTEMPTS),
+        wait=wait_exponential(multiplier=0.5, max=8),
+        retry=retry_if_exception_type(retry_exceptions) | retry_if_result(_bad_status),
+        retry_error_callback=_give_up
+    )
+    if semaphore is None:
+        return retrying(session.request, method, url, **kwargs)
+    # 流式响应只在收到响应头之前占用名额
+    with semaphore:
+        return retrying(session.request, method, url, **kwargs)
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
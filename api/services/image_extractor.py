@@ -1,63 +1,173 @@
-import requests
-from bs4 import BeautifulSoup
 import logging
 from urllib.parse import urljoin
 import os
+from datetime import datetime, timedelta
+from ..models.image_cache import CachedImage
+from . import http_client
+from .html_parser import make_soup
 
 # 确保环境中没有代理设置
 os.environ.pop('HTTPS_PROXY', None)
 os.environ.pop('HTTP_PROXY', None)
 
-def extract_article_image(url):
+# 图片缓存有效期：成功结果长期有效；页面确实没有图片时较短；
+# 请求失败（超时、5xx 等）多为暂时性问题，只缓存几分钟，避免一次失败让文章一整天没有图片
+IMAGE_CACHE_TTL = timedelta(days=int(os.environ.get('IMAGE_CACHE_TTL_DAYS', 30)))
+IMAGE_CACHE_NEGATIVE_TTL = timedelta(hours=int(os.environ.get('IMAGE_CACHE_NEGATIVE_TTL_HOURS', 24)))
+IMAGE_CACHE_ERROR_TTL = timedelta(minutes=int(os.environ.get('IMAGE_CACHE_ERROR_TTL_MINUTES', 15)))
+
+# 流式读取 <head> 的参数
+HEAD_END_TAG = b'</head>'
+HEAD_SCAN_CHUNK_SIZE = 16 * 1024
+HEAD_SCAN_MAX_BYTES = 256 * 1024
+
+def extract_article_image(url, use_cache=True):
     """
     从文章URL中提取最相关的图片URL
+    结果（包括无图和失败）按 URL 缓存在 MongoDB 中，多个进程共享
+    """
+    if use_cache:
+        cached = _get_cached_image(url)
+        if cached is not None:
+            return cached.image_url or None
+            
+    image_url, status = _extract_article_image_uncached(url)
+    
+    if use_cache:
+        _set_cached_image(url, image_url, status)
+    return image_url
+
+def _get_cached_image(url):
+    try:
+        return CachedImage.objects(url=url, expires_at__gt=datetime.utcnow()).first()
+    except Exception as e:
+        logging.warning(f"Image cache lookup failed for {url}: {str(e)}")
+        return None
+
+def _cache_ttl(status):
+    if status == 'found':
+        return IMAGE_CACHE_TTL
+    if status == 'error':
+        return IMAGE_CACHE_ERROR_TTL
+    return IMAGE_CACHE_NEGATIVE_TTL
+
+def _set_cached_image(url, image_url, status):
+    ttl = _cache_ttl(status)
+    now = datetime.utcnow()
+    try:
+        CachedImage.objects(url=url).update_one(
+            set__image_url=image_url,
+            set__status=status,
+            set__checked_at=now,
+            set__expires_at=now + ttl,
+            upsert=True
+        )
+    except Exception as e:
+        logging.warning(f"Image cache write failed for {url}: {str(e)}")
+
+def _extract_article_image_uncached(url):
+    """
+    实际请求页面并提取图片
+    先流式读取 <head>（或前 HEAD_SCAN_MAX_BYTES 字节）查找 og/twitter 图片，
+    只有 head 中没有结果时才读取完整页面走正文启发式规则
+    :return: (image_url, status)，status 为 found / none / error
     """
+    response = None
     try:
         # 设置请求头
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        # 直接请求，不使用代理
-        response = requests.get(
+        # 直接请求，不使用代理（通过共享连接池）
+        response = http_client.get(
             url,
             headers=headers,
             timeout=10,
-            verify=True
+            verify=True,
+            stream=True
         )
         
         if response.status_code != 200:
-            return None
+            return None, 'error'
             
-        soup = BeautifulSoup(response.text, 'html.parser')
+        chunks = response.iter_content(chunk_size=HEAD_SCAN_CHUNK_SIZE)
+        head = _read_head(chunks)
         
-        # 优先级顺序查找图片
-        # 1. Open Graph 图片
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            return og_image['content']
+        # 1/2. 只扫描 head 部分的 Open Graph / Twitter Card 图片
+        image_url = _find_meta_image(_make_soup(head, response.encoding))
+        if image_url:
+            return image_url, 'found'
             
-        # 2. Twitter Card 图片
-        twitter_image = soup.find('meta', property='twitter:image')
-        if twitter_image and twitter_image.get('content'):
-            return twitter_image['content']
-            
-        # 3. 文章主体中的第一张图片
-        article_tag = soup.find(['article', 'main', '.post-content', '.article-content'])
-        if article_tag:
-            first_image = article_tag.find('img')
-            if first_image and first_image.get('src'):
-                return urljoin(url, first_image['src'])
-                
-        # 4. 页面中任何看起来像文章图片的图片
-        images = soup.find_all('img')
-        for img in images:
-            src = img.get('src')
-            if src and any(keyword in src.lower() for keyword in ['article', 'post', 'feature', 'main', 'hero']):
-                return urljoin(url, src)
-                
-        return None
+        # head 中没有，读取剩余内容后按完整页面处理
+        body = head + b''.join(chunks)
+        image_url = _find_page_image(_make_soup(body, response.encoding), url)
+        if image_url:
+            return image_url, 'found'
+        return None, 'none'
         
     except Exception as e:
         logging.error(f"Error extracting image from {url}: {str(e)}")
-        return None
\ No newline at end of file
+        return None, 'error'
+    finally:
+        if response is not None:
+            response.close()
+
+def _read_head(chunks):
+    """流式读取，直到出现 </head> 或达到字节上限"""
+    buffer = bytearray()
+    for chunk in chunks:
+        # 只在新数据（加上可能跨块的标签长度）中查找，避免重复扫描
+        search_from = max(0, len(buffer) - len(HEAD_END_TAG))
+        buffer.extend(chunk)
+        if HEAD_END_TAG in buffer[search_from:].lower():
+            break
+        if len(buffer) >= HEAD_SCAN_MAX_BYTES:
+            break
+    return bytes(buffer)
+
+def _make_soup(content, encoding, parser=None):
+    # 与 response.text 一致：有声明编码时按其解码，否则交给 BeautifulSoup 自动识别
+    if encoding:
+        try:
+            content = content.decode(encoding, errors='replace')
+        except LookupError:
+            # Content-Type 中的 charset 无法识别：传入原始字节，由 BeautifulSoup 自动识别编码
+            logging.warning(f"Unknown charset {encoding!r}, letting the parser detect the encoding")
+    return make_soup(content, parser)
+
+def _find_meta_image(soup):
+    """按优先级查找 Open Graph、Twitter Card 图片"""
+    # 1. Open Graph 图片
+    og_image = soup.find('meta', property='og:image')
+    if og_image and og_image.get('content'):
+        return og_image['content']
+        
+    # 2. Twitter Card 图片
+    twitter_image = soup.find('meta', property='twitter:image')
+    if twitter_image and twitter_image.get('content'):
+        return twitter_image['content']
+        
+    return None
+
+def _find_page_image(soup, url):
+    """完整页面的图片查找规则"""
+    image_url = _find_meta_image(soup)
+    if image_url:
+        return image_url
+        
+    # 3. 文章主体中的第一张图片
+    article_tag = soup.find(['article', 'main', '.post-content', '.article-content'])
+    if article_tag:
+        first_image = article_tag.find('img')
+        if first_image and first_image.get('src'):
+            return urljoin(url, first_image['src'])
+            
+    # 4. 页面中任何看起来像文章图片的图片
+    images = soup.find_all('img')
+    for img in images:
+        src = img.get('src')
+        if src and any(keyword in src.lower() for keyword in ['article', 'post', 'feature', 'main', 'hero']):
+            return urljoin(url, src)
+            
+    return None
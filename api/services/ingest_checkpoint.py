@@ -0,0 +1,98 @@
+"""
+采集断点续传
+每篇文章以原文哈希为 key，在 newsletter_staging 中记录翻译和图片的完成状态，
+失败或超时后重新采集同一天时只处理未完成的部分
+"""
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from ..models.article import NewsletterStaging
+
+def source_hash(raw_article):
+    """文章原文（标题、内容、链接）的哈希"""
+    raw = '\0'.join([raw_article['title'], raw_article['content'], raw_article['url']])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class IngestCheckpoint:
+    def __init__(self, date):
+        self.date = str(date)
+        self._lock = threading.Lock()
+        self._articles = {}
+        try:
+            staging = NewsletterStaging.objects(date=self.date).first()
+            if staging:
+                self._articles = dict(staging.articles or {})
+                logging.info(f"Resuming ingestion for {self.date} from {len(self._articles)} staged articles")
+        except Exception as e:
+            logging.warning(f"Failed to load ingestion checkpoint for {self.date}: {str(e)}")
+    
+    def seed_from_sections(self, sections):
+        """
+        用已入库简报中的文章预填进度（只在内存中）：
+        源页面更新时，原文没变的文章直接复用已有翻译和图片
+        """
+        with self._lock:
+            for section in sections:
+                for article in section['articles']:
+                    key = source_hash({
+                        'title': article.get('title_en', ''),
+                        'content': article.get('content_en', ''),
+                        'url': article.get('url', '')
+                    })
+                    self._articles.setdefault(key, {
+                        'translation': 'done',
+                        'title': article.get('title'),
+                        'content': article.get('content'),
+                        'image': 'done',
+                        'image_url': article.get('image_url')
+                    })
+    
+    def get(self, raw_article):
+        """:return: 已暂存的文章状态（没有则为空字典）"""
+        with self._lock:
+            return dict(self._articles.get(source_hash(raw_article), {}))
+    
+    def has_translation(self, raw_article):
+        return self.get(raw_article).get('translation') == 'done'
+    
+    def has_image(self, raw_article):
+        return self.get(raw_article).get('image') == 'done'
+    
+    def save_translation(self, raw_article, title_zh, content_zh):
+        self._save(raw_article, {
+            'translation': 'done',
+            'title': title_zh,
+            'content': content_zh
+        })
+    
+    def save_image(self, raw_article, image_url):
+        self._save(raw_article, {
+            'image': 'done',
+            'image_url': image_url
+        })
+    
+    def discard(self):
+        """正式文档写入后删除暂存"""
+        try:
+            NewsletterStaging.objects(date=self.date).delete()
+        except Exception as e:
+            logging.warning(f"Failed to discard ingestion checkpoint for {self.date}: {str(e)}")
+    
+    def _save(self, raw_article, fields):
+        key = source_hash(raw_article)
+        with self._lock:
+            state = self._articles.setdefault(key, {})
+            state.update(fields)
+            
+        # 只更新这一篇文章的字段，多线程写入互不覆盖
+        updates = {f'set__articles__{key}__{name}': value for name, value in fields.items()}
+        try:
+            NewsletterStaging.objects(date=self.date).update_one(
+                set__updated_at=datetime.utcnow(),
+                set_on_insert__created_at=datetime.utcnow(),
+                upsert=True,
+                **updates
+            )
+        except Exception as e:
+            logging.warning(f"Failed to checkpoint article for {self.date}: {str(e)}")
@@ -0,0 +1,138 @@
+"""
+后台采集任务队列（MongoDB 实现）
+HTTP 请求只负责入队，实际的抓取和翻译由 worker.py 完成
+"""
+import logging
+import os
+import pytz
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from mongoengine.errors import NotUniqueError
+from ..models.article import DailyNewsletter
+from ..models.ingest_job import IngestJob
+from .single_flight import OWNER_ID, keep_alive
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# 没有内容（tldr.tech 尚未发布）或失败的任务，间隔多久后允许重新入队
+RETRY_SECONDS = int(os.environ.get('INGEST_RETRY_SECONDS', 600))
+# 单个任务的执行租约：执行期间每隔 JOB_RENEW_SECONDS 续约（见 job_lease），
+# worker 崩溃后最多这么久任务会被其他 worker 重新领取
+JOB_LEASE_SECONDS = int(os.environ.get('INGEST_JOB_LEASE_SECONDS', 900))
+JOB_RENEW_SECONDS = JOB_LEASE_SECONDS / 3
+# 今天的简报入库后，调度器每隔多久重新检查一次源页面是否更新
+REFRESH_SECONDS = int(os.environ.get('INGEST_REFRESH_SECONDS', 1800))
+# 连续失败多少次后不再自动重新入队
+MAX_ATTEMPTS = int(os.environ.get('INGEST_MAX_ATTEMPTS', 5))
+
+def today_et():
+    return datetime.now(pytz.timezone('US/Eastern')).strftime('%Y-%m-%d')
+
+def normalize_date(date):
+    """把 2024-6-4 等写法统一为 YYYY-MM-DD（任务、缓存和数据库都以此为键），不合法时返回 None"""
+    try:
+        return datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+def is_ingestable_date(date):
+    """合法的 YYYY-MM-DD 且不晚于美东时间今天"""
+    normalized = normalize_date(date)
+    return normalized is not None and normalized == date and date <= today_et()
+
+def get_job(date):
+    return IngestJob.objects(date=date).first()
+
+def enqueue_ingest(date, refresh=False):
+    """
+    为某个日期入队采集任务（幂等）
+    - 已在排队或执行中：直接返回现有任务
+    - 最近刚结束为 empty/failed：在 RETRY_SECONDS 内不重复入队
+    - 已完成：refresh=True 且距上次完成超过 REFRESH_SECONDS 时重新入队，检查源页面是否更新
+    :return: IngestJob
+    """
+    job = get_job(date)
+    now = datetime.utcnow()
+    
+    if job:
+        if job.status in ACTIVE_STATUSES:
+            return job
+        if job.status in ('empty', 'failed'):
+            recently_finished = job.finished_at and job.finished_at > now - timedelta(seconds=RETRY_SECONDS)
+            if recently_finished or (job.status == 'failed' and (job.failures or 0) >= MAX_ATTEMPTS):
+                return job
+        if job.status == 'done' and DailyNewsletter.complete(date=date).count():
+            stale = job.finished_at and job.finished_at < now - timedelta(seconds=REFRESH_SECONDS)
+            if not (refresh and stale):
+                return job
+            
+    try:
+        # 重新入队是一次新的执行：领取次数和错误信息清零（连续失败次数保留，见 finish_job）
+        IngestJob.objects(date=date, status__nin=list(ACTIVE_STATUSES)).update_one(
+            set__status='queued',
+            set__queued_at=now,
+            set__attempts=0,
+            set__error=None,
+            set_on_insert__created_at=now,
+            upsert=True
+        )
+        logging.info(f"Queued ingest job for {date}")
+    except NotUniqueError:
+        # 另一个请求刚刚入队（或任务正在执行）
+        pass
+        
+    return get_job(date)
+
+def claim_next_job():
+    """原子地领取最早入队的任务（包括租约已过期的执行中任务）"""
+    now = datetime.utcnow()
+    raw = IngestJob._get_collection().find_one_and_update(
+        {'$or': [
+            {'status': 'queued'},
+            {'status': 'running', 'lease_until': {'$lt': now}}
+        ]},
+        {
+            '$set': {
+                'status': 'running',
+                'owner': OWNER_ID,
+                'started_at': now,
+                'lease_until': now + timedelta(seconds=JOB_LEASE_SECONDS)
+            },
+            '$inc': {'attempts': 1}
+        },
+        sort=[('queued_at', 1)],
+        return_document=ReturnDocument.AFTER
+    )
+    return IngestJob._from_son(raw) if raw else None
+
+def renew_job(job):
+    """延长执行中任务的租约，任务已被其他 worker 领取时返回 False"""
+    return bool(IngestJob.objects(id=job.id, owner=OWNER_ID, status='running').update_one(
+        set__lease_until=datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+    ))
+
+def job_lease(job):
+    """with job_lease(job): ... 执行期间持续续约，耗时较长的任务不会被重新领取"""
+    return keep_alive(lambda: renew_job(job), JOB_RENEW_SECONDS, f"ingest job {job.date}")
+
+def finish_job(job, status, error=None):
+    # 失败时累计连续失败次数，成功（或源站暂无内容）时清零
+    failures = {'inc__failures': 1} if status == 'failed' else {'set__failures': 0}
+    updated = IngestJob.objects(id=job.id, owner=OWNER_ID).update_one(
+        set__status=status,
+        set__error=error,
+        set__finished_at=datetime.utcnow(),
+        unset__lease_until=True,
+        **failures
+    )
+    if not updated:
+        logging.warning(f"Ingest job for {job.date} was taken over by another worker, result {status} not recorded")
+        return
+    logging.info(f"Ingest job for {job.date} finished: {status}")
+
+def schedule_today():
+    """
+    调度器：今天的简报还没有入库时入队（尚未发布时会按 RETRY_SECONDS 间隔反复检查）；
+    入库后按 REFRESH_SECONDS 间隔重新检查，源页面使用条件请求，未变化时几乎没有开销
+    """
+    return enqueue_ingest(today_et(), refresh=True)
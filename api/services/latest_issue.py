@@ -0,0 +1,125 @@
+"""
+最新一期简报的指针
+采集时更新 IssuePointer 文档，读取时经过进程内 TTL 缓存，
+各接口解析"最新一期"无需每次按日期排序查询并构建整期简报
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from ..models.issue_pointer import IssuePointer
+from .repository import get_latest_issue_date
+
+# 进程内缓存时长（秒）；本进程采集后立即更新，其他进程最多延迟这么久看到新的一期
+LATEST_ISSUE_TTL_SECONDS = float(os.environ.get('LATEST_ISSUE_TTL_SECONDS', 30))
+
+LATEST = 'latest'
+LATEST_COMPLETE = 'latest_complete'
+# 整个归档的版本：latest 只在更新的日期入库时变化，回填较早的日期不会改变它；
+# 覆盖全部简报的缓存（例如 sitemap）使用这个版本
+ARCHIVE = 'archive'
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _pointer_name(complete_only):
+    return LATEST_COMPLETE if complete_only else LATEST
+
+def _remember(name, date, version):
+    with _cache_lock:
+        _cache[name] = (date, version, time.monotonic() + LATEST_ISSUE_TTL_SECONDS)
+
+def _cached_pointer(name):
+    """进程内缓存中未过期的 (date, version)"""
+    with _cache_lock:
+        cached = _cache.get(name)
+    if cached and cached[2] > time.monotonic():
+        return cached[0], cached[1]
+    return None
+
+def _advance(name, date):
+    """
+    指针只向前移动：date 不早于当前日期时更新并递增 version
+    当前日期更晚时条件不匹配，upsert 触发唯一索引冲突，保持不变
+    """
+    try:
+        pointer = IssuePointer._get_collection().find_one_and_update(
+            {'name': name, 'date': {'$lte': date}},
+            {
+                '$set': {'date': date, 'updated_at': datetime.utcnow()},
+                '$inc': {'version': 1}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        _remember(name, pointer['date'], pointer['version'])
+    except DuplicateKeyError:
+        pass
+
+def _bump_archive(date):
+    pointer = IssuePointer._get_collection().find_one_and_update(
+        {'name': ARCHIVE},
+        {
+            '$set': {'date': date, 'updated_at': datetime.utcnow()},
+            '$inc': {'version': 1}
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _remember(ARCHIVE, pointer['date'], pointer['version'])
+
+def advance_latest_issue(date, complete=True):
+    """
+    某一期入库或更新后调用：partial 只移动 latest，complete 同时移动两个指针；
+    无论日期新旧，归档版本都会递增
+    """
+    try:
+        _bump_archive(date)
+        _advance(LATEST, date)
+        if complete:
+            _advance(LATEST_COMPLETE, date)
+    except Exception as e:
+        logging.error(f"Failed to advance latest issue pointer to {date}: {str(e)}")
+
+def get_latest_pointer(complete_only=False):
+    """
+    :return: (日期 YYYY-MM-DD, version)，没有任何简报时为 (None, 0)
+    """
+    name = _pointer_name(complete_only)
+    cached = _cached_pointer(name)
+    if cached:
+        return cached
+        
+    pointer = IssuePointer._get_collection().find_one({'name': name}, {'date': 1, 'version': 1})
+    if pointer is None:
+        # 首次使用（或指针被删除）：排序查询一次并写入指针
+        date = get_latest_issue_date(complete_only=complete_only)
+        if date is None:
+            return None, 0
+        _advance(name, date)
+        pointer = IssuePointer._get_collection().find_one({'name': name}, {'date': 1, 'version': 1})
+        
+    _remember(name, pointer['date'], pointer['version'])
+    return pointer['date'], pointer['version']
+
+def get_archive_version():
+    """归档版本：任意一期写入后递增；还没有任何写入记录时为 0"""
+    cached = _cached_pointer(ARCHIVE)
+    if cached:
+        return cached[1]
+        
+    pointer = IssuePointer._get_collection().find_one({'name': ARCHIVE}, {'date': 1, 'version': 1})
+    if pointer is None:
+        return 0
+    _remember(ARCHIVE, pointer['date'], pointer['version'])
+    return pointer['version']
+
+def get_latest_date(complete_only=False):
+    return get_latest_pointer(complete_only)[0]
+
+def clear_latest_cache():
+    with _cache_lock:
+        _cache.clear()
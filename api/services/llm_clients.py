@@ -0,0 +1,56 @@
+"""
+进程内共享的 LLM 客户端
+按 (provider, base_url, api_key) 懒加载并缓存 OpenAI 兼容客户端，
+所有翻译和标题生成调用复用同一个 httpx 连接池，避免每次新建客户端和 TLS 握手。
+httpx.Client / OpenAI 客户端本身是线程安全的，可以在采集线程池中共享。
+"""
+import os
+import threading
+import httpx
+from openai import OpenAI
+
+DEEPSEEK_BASE_URL = os.environ.get('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
+
+# 连接池与超时配置
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', 32))
+LLM_MAX_KEEPALIVE = int(os.environ.get('LLM_MAX_KEEPALIVE', 16))
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 120))
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 10))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_llm_client(api_key, base_url=None, provider='deepseek'):
+    """获取（必要时创建）共享客户端"""
+    base_url = (base_url or DEEPSEEK_BASE_URL).rstrip('/')
+    key = (provider, base_url, api_key)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+        
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE
+                ),
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+            )
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=http_client,
+                # 重试由 llm_limiter 统一处理，以便观察到每一次 429 并遵守 Retry-After
+                max_retries=0
+            )
+            _clients[key] = client
+        return client
+
+def close_llm_clients():
+    """关闭所有共享客户端（进程退出或修改配置后使用）"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,241 @@
+"""
+LLM（DeepSeek）调用的自适应限流
+所有 chat.completions 调用都通过 create_chat_completion() 发出：
+- 令牌桶：限制每分钟请求数（RPM）和每分钟 token 数（TPM）
+- AIMD 并发控制：成功时缓慢增加并发，遇到 429/超时/5xx 时减半；
+  同一批在途请求的失败只减半一次（两次减半之间至少间隔一个请求延迟）
+  成功但耗时较长的请求不算过载：批量翻译的输出很长，延迟随输出 token 数增长
+- 遵守 Retry-After：收到限流响应后所有调用暂停到指定时间，再重试而不是直接放弃
+- metrics() 返回当前状态，供 /api/metrics/llm 展示
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+import openai
+
+# 每分钟请求数 / token 数上限（0 表示不限制）
+LLM_RPM_LIMIT = int(os.environ.get('LLM_RPM_LIMIT', 0))
+LLM_TPM_LIMIT = int(os.environ.get('LLM_TPM_LIMIT', 0))
+# 并发上限（AIMD 在 1 到该值之间调整），以及初始并发
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))
+LLM_INITIAL_CONCURRENCY = int(os.environ.get('LLM_INITIAL_CONCURRENCY', 4))
+# 两次减半之间的最短间隔（秒）；已有成功请求时取平均延迟和该值中较大者
+LLM_DECREASE_INTERVAL = float(os.environ.get('LLM_DECREASE_INTERVAL', 5))
+# 可重试错误的最多尝试次数
+LLM_MAX_ATTEMPTS = int(os.environ.get('LLM_MAX_ATTEMPTS', 4))
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+class TokenBucket:
+    """按分钟速率连续补充的令牌桶"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount):
+        """取出 amount 个令牌，不足时阻塞等待；超过容量的请求在桶满时放行"""
+        if self.per_minute <= 0:
+            return
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) * 60.0 / self.per_minute
+            time.sleep(min(wait, 5.0))
+
+    def adjust(self, amount):
+        """根据实际用量修正（正数为补扣，负数为退还）"""
+        if self.per_minute <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+class AdaptiveLimiter:
+    """AIMD 并发控制 + RPM/TPM 令牌桶 + Retry-After 暂停"""
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, initial_concurrency=LLM_INITIAL_CONCURRENCY,
+                 rpm=LLM_RPM_LIMIT, tpm=LLM_TPM_LIMIT, decrease_interval=LLM_DECREASE_INTERVAL):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(min(max(1, initial_concurrency), self.max_concurrency))
+        self.decrease_interval = decrease_interval
+        self.last_decrease = None
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        # 最近一分钟的请求记录 (时间, token 数, 是否出错)，用于统计
+        self._window = deque()
+        self._counters = {
+            'requests': 0,
+            'successes': 0,
+            'rate_limited': 0,
+            'timeouts': 0,
+            'server_errors': 0,
+            'other_errors': 0,
+            'retries': 0,
+            'tokens': 0
+        }
+        self._latency_ewma = None
+
+    def set_max_concurrency(self, limit):
+        with self._cond:
+            self.max_concurrency = max(1, limit)
+            self.limit = min(self.limit, self.max_concurrency)
+            self._cond.notify_all()
+
+    def acquire(self, estimated_tokens):
+        # 先等 Retry-After 暂停结束，再占并发名额，最后扣令牌
+        with self._cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(timeout=pause)
+                    continue
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    break
+                self._cond.wait(timeout=1.0)
+        self.requests.take(1)
+        self.tokens.take(estimated_tokens)
+
+    def release(self, latency, used_tokens, estimated_tokens, error=None, retry_after=None):
+        if used_tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            self._counters['requests'] += 1
+            self._window.append((now, used_tokens or estimated_tokens, error is not None))
+            while self._window and self._window[0][0] < now - 60:
+                self._window.popleft()
+
+            if error is None:
+                self._counters['successes'] += 1
+                self._counters['tokens'] += used_tokens or 0
+                self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+                # 加性增加：每完成约 limit 个成功请求，并发 +1
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            else:
+                self._counters[error] += 1
+                if error != 'other_errors':
+                    self._decrease(now)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                    logging.warning(f"LLM rate limited, pausing all calls for {retry_after:.1f}s")
+            self._cond.notify_all()
+
+    def record_retry(self):
+        with self._cond:
+            self._counters['retries'] += 1
+
+    def metrics(self):
+        with self._cond:
+            now = time.monotonic()
+            recent = [entry for entry in self._window if entry[0] >= now - 60]
+            return {
+                'concurrency_limit': round(self.limit, 2),
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'requests_per_minute': len(recent),
+                'tokens_per_minute': sum(entry[1] for entry in recent),
+                'error_rate': round(sum(1 for entry in recent if entry[2]) / len(recent), 4) if recent else 0.0,
+                'latency_ewma_seconds': round(self._latency_ewma, 3) if self._latency_ewma is not None else None,
+                'paused_for_seconds': round(max(0.0, self.paused_until - now), 1),
+                'rpm_limit': self.requests.per_minute,
+                'tpm_limit': self.tokens.per_minute,
+                **self._counters
+            }
+
+    def _decrease(self, now):
+        # 乘性减少：减半前发出的在途请求随后陆续失败时不再重复减半
+        interval = max(self.decrease_interval, self._latency_ewma or 0.0)
+        if self.last_decrease is not None and now - self.last_decrease < interval:
+            return
+        self.last_decrease = now
+        self.limit = max(1.0, self.limit / 2)
+
+limiter = AdaptiveLimiter()
+
+def set_max_concurrency(limit):
+    """在运行时修改并发上限，批量回填脚本使用"""
+    limiter.set_max_concurrency(limit if limit > 0 else LLM_MAX_CONCURRENCY)
+
+def metrics():
+    return limiter.metrics()
+
+def _estimate_tokens(kwargs):
+    # 粗略估算：中英文混合按约 2 个字符 1 个 token，再加上最多输出 token 的一半
+    chars = sum(len(message.get('content') or '') for message in kwargs.get('messages', []))
+    return chars // 2 + kwargs.get('max_tokens', 0) // 2
+
+def _classify(error):
+    if isinstance(error, openai.RateLimitError):
+        return 'rate_limited'
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return 'timeouts'
+    if isinstance(error, openai.InternalServerError):
+        return 'server_errors'
+    return 'other_errors'
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    value = response.headers.get('retry-after')
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+def create_chat_completion(client, **kwargs):
+    """
+    通过限流器调用 client.chat.completions.create(**kwargs)
+    可重试错误（429/超时/连接错误/5xx）会按 Retry-After 或指数退避重试，
+    用尽后抛出最后一个异常，由调用方决定如何降级
+    """
+    estimated = _estimate_tokens(kwargs)
+    for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+        limiter.acquire(estimated)
+        started = time.monotonic()
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            retry_after = _retry_after(e) if isinstance(e, openai.RateLimitError) else None
+            if isinstance(e, openai.RateLimitError) and retry_after is None:
+                retry_after = min(2 ** attempt, 30)
+            limiter.release(time.monotonic() - started, None, estimated, error=_classify(e), retry_after=retry_after)
+
+            if not isinstance(e, RETRYABLE_ERRORS) or attempt == LLM_MAX_ATTEMPTS:
+                raise
+            limiter.record_retry()
+            logging.warning(f"LLM call failed ({type(e).__name__}), retrying (attempt {attempt + 1}/{LLM_MAX_ATTEMPTS})")
+            if retry_after is None:
+                time.sleep(min(2 ** attempt, 30))
+            continue
+
+        usage = getattr(response, 'usage', None)
+        used = getattr(usage, 'total_tokens', None) if usage else None
+        limiter.release(time.monotonic() - started, used, estimated)
+        return response
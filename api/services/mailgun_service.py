@@ -3,7 +3,14 @@ from flask import current_app
 import logging
 from typing import Optional
 import json
-from api.models.subscriber import Subscriber
+import os
+from api.services import http_client
+from api.services.repository import get_subscriber_ids
+
+# 连接超时（秒）；读取默认不设超时（MAILGUN_READ_TIMEOUT 可指定秒数）：
+# Mailgun 可能已经接受了整批邮件但响应较慢，读取超时后调用方重试会给所有收件人重复发送
+MAILGUN_CONNECT_TIMEOUT = float(os.environ.get('MAILGUN_CONNECT_TIMEOUT', 10))
+MAILGUN_READ_TIMEOUT = float(os.environ['MAILGUN_READ_TIMEOUT']) if os.environ.get('MAILGUN_READ_TIMEOUT') else None
 
 class MailgunService:
     def __init__(self, api_key: str, domain: str):
@@ -11,52 +18,64 @@ class MailgunService:
         self.domain = domain
         self.base_url = f"https://api.mailgun.net/v3/{domain}"
         
+    def _post_message(self, data: dict):
+        """
+        发送一条消息请求
+        http_client 对 POST 只在连接未建立（连接超时）或收到 429 时重试，
+        请求发出后不会重试，因此不会因为重试而重复发信
+        """
+        return http_client.post(
+            f"{self.base_url}/messages",
+            auth=("api", self.api_key),
+            data=data,
+            timeout=(MAILGUN_CONNECT_TIMEOUT, MAILGUN_READ_TIMEOUT)
+        )
+        
     def send_confirmation_email(self, to_email: str, confirmation_link: str) -> dict:
         """发送订阅确认邮件"""
         try:
-            return requests.post(
-                f"{self.base_url}/messages",
-                auth=("api", self.api_key),
-                data={
-                    "from": f"【太长不看】科技日推 <confirm@{self.domain}>",
-                    "to": [to_email],
-                    "subject": "确认订阅 【太长不看】 科技日推",
-                    "html": self._get_confirmation_template(confirmation_link)
-                }
-            )
+            return self._post_message({
+                "from": f"【太长不看】科技日推 <confirm@{self.domain}>",
+                "to": [to_email],
+                "subject": "确认订阅 【太长不看】 科技日推",
+                "html": self._get_confirmation_template(confirmation_link)
+            })
         except Exception as e:
             logging.error(f"Failed to send confirmation email: {str(e)}")
             raise
             
-    def send_daily_newsletter(self, subscribers: list, subject: str, content: str) -> dict:
-        """发送每日新闻邮件"""
+    def send_daily_newsletter(self, subscribers: list, subject: str, content: str,
+                              subscriber_ids: Optional[dict] = None) -> dict:
+        """
+        发送每日新闻邮件
+        :param subscriber_ids: {邮箱: 订阅者 id}，未提供时一次性批量查询
+        """
         try:
+            if subscriber_ids is None:
+                subscriber_ids = get_subscriber_ids(subscribers)
+                
             # 为每个收件人准备变量
             recipient_vars = {
                 email: {
-                    'id': str(Subscriber.objects(email=email).first().id)
+                    'id': subscriber_ids.get(email, '')
                 } for email in subscribers
             }
             
-            return requests.post(
-                f"{self.base_url}/messages",
-                auth=("api", self.api_key),
-                data={
-                    "from": f"太长不看 | 科技日推 <newsletter@{self.domain}>",
-                    "to": subscribers,
-                    "subject": subject,
-                    "html": content,
-                    "recipient-variables": json.dumps(recipient_vars),  # 添加收件人变量
-                    "h:Reply-To": f"support@{self.domain}",
-                    "o:tag": ["daily-newsletter"],
-                    "o:dkim": "yes",
-                    "o:tracking": "yes",
-                    "o:tracking-clicks": "yes",
-                    "o:tracking-opens": "yes",
-                    "o:require-tls": "yes",
-                    "o:skip-verification": "no"
-                }
-            )
+            return self._post_message({
+                "from": f"太长不看 | 科技日推 <newsletter@{self.domain}>",
+                "to": subscribers,
+                "subject": subject,
+                "html": content,
+                "recipient-variables": json.dumps(recipient_vars),  # 添加收件人变量
+                "h:Reply-To": f"support@{self.domain}",
+                "o:tag": ["daily-newsletter"],
+                "o:dkim": "yes",
+                "o:tracking": "yes",
+                "o:tracking-clicks": "yes",
+                "o:tracking-opens": "yes",
+                "o:require-tls": "yes",
+                "o:skip-verification": "no"
+            })
         except Exception as e:
             logging.error(f"Failed to send newsletter: {str(e)}")
             raise
@@ -88,16 +107,12 @@ class MailgunService:
             logging.info(f"Sending email to: {to_email}")
             logging.info(f"Using domain: {self.domain}")
             
-            response = requests.post(
-                f"{self.base_url}/messages",
-                auth=("api", self.api_key),
-                data={
-                    "from": f"TLDR Chinese <mailgun@{self.domain}>",
-                    "to": [to_email],
-                    "subject": subject,
-                    "text": text
-                }
-            )
+            response = self._post_message({
+                "from": f"TLDR Chinese <mailgun@{self.domain}>",
+                "to": [to_email],
+                "subject": subject,
+                "text": text
+            })
             
             # 打印响应信息
             logging.info(f"Status code: {response.status_code}")
@@ -1,18 +1,40 @@
-from bs4 import BeautifulSoup
 import requests
 import pytz
 from datetime import datetime
 from functools import lru_cache
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from ..services.translator import TranslatorService
 from ..services.image_extractor import extract_article_image
+from ..services import http_client
+from ..services.html_parser import make_soup
+from ..services.emoji_mapper import add_display_fields, article_display_fields, get_section_emoji
+from ..services.single_flight import run_single_flight, lease_state
+from ..services.ingest_checkpoint import IngestCheckpoint
+from ..services.response_cache import invalidate_issue
+from ..services.section_highlights import refresh_section_highlights
+from ..services.repository import get_issue
+from ..services.latest_issue import advance_latest_issue, get_latest_date
+from ..services.source_pages import (
+    get_source_page,
+    conditional_headers,
+    content_hash,
+    is_unchanged,
+    remember_source_page,
+    touch_source_page
+)
 from flask import current_app
+from mongoengine.errors import NotUniqueError
 from ..models.article import DailyNewsletter
 import logging
 import json
 import os
 from ..services.title_generator import TitleGeneratorService
 
+class IngestError(Exception):
+    """抓取、翻译或生成失败（tldr.tech 当天尚未发布不算失败，返回 None）"""
+
 def get_newsletter(date=None):
     """
     获取每日新闻简报
@@ -39,38 +61,45 @@ def get_newsletter(date=None):
         # 检查是否是未来日期（相对于美东时间）
         if date_obj_et.date() > now_et.date():
             logging.warning(f"请求的未来日期: {date} ET, 返回最新可用简报")
-            latest_newsletter = DailyNewsletter.objects().order_by('-date').first()
+            latest_newsletter = _load_latest_issue()
             if latest_newsletter:
                 logging.info(f"Found latest newsletter from: {latest_newsletter.date}")
                 return {
                     'sections': latest_newsletter.sections,
-                    'generated_title': latest_newsletter.generated_title
+                    'generated_title': latest_newsletter.generated_title,
+                    'status': 'complete'
                 }
             logging.warning("数据库中没有简报")
             return None
             
-        # 查找数据库
-        newsletter = DailyNewsletter.objects(date=date_obj_et.date()).first()
-        if newsletter:
+        # 查找数据库（部分发布且已无人继续生成的简报需要重新生成）
+        newsletter = get_issue(date_obj_et.date())
+        if newsletter and not is_abandoned_partial(newsletter):
             logging.info(f"Found newsletter in database for {date} ET")
             return {
                 'sections': newsletter.sections,
-                'generated_title': newsletter.generated_title
+                'generated_title': newsletter.generated_title,
+                'status': 'complete' if newsletter.is_complete else 'partial'
             }
             
         # 如果数据库中没有，获取新内容
         logging.info(f"Newsletter not found in database, fetching from source for {date} ET")
-        articles = fetch_tldr_content(date)
+        try:
+            articles = generate_newsletter(date)
+        except IngestError as e:
+            logging.error(f"Failed to generate newsletter for {date} ET: {str(e)}")
+            articles = None
         
         if not articles:
             logging.warning(f"No content available for date: {date} ET, trying to get latest available")
-            latest_newsletter = DailyNewsletter.objects().order_by('-date').first()
+            latest_newsletter = _load_latest_issue()
             if latest_newsletter:
                 logging.info(f"Returning latest available newsletter from: {latest_newsletter.date}")
                 # 返回完整的信息，包括 sections 和 generated_title
                 return {
                     'sections': latest_newsletter.sections,
-                    'generated_title': latest_newsletter.generated_title
+                    'generated_title': latest_newsletter.generated_title,
+                    'status': 'complete'
                 }
             return None
             
@@ -100,79 +129,196 @@ def get_newsletter(date=None):
         logging.error(f"Error in get_newsletter: {str(e)}")
         return None
 
-def fetch_tldr_content(date):
-    url = f"https://tldr.tech/tech/{date}"
-    logging.info(f"Fetching content from: {url}")
-    
+def _load_latest_issue():
+    """未来日期或当天无内容时的回退：只使用最新的完整简报，不返回部分发布的内容"""
+    latest_date = get_latest_date(complete_only=True)
+    return get_issue(latest_date, complete_only=True) if latest_date else None
+
+def _generation_key(date):
+    return f"newsletter:{date}"
+
+def is_generation_active(date):
+    """是否有进程正在生成该日期的简报（持有未过期的生成租约）"""
     try:
-        response = requests.get(url, timeout=10)  # 添加超时设置
-        logging.info(f"Response status code: {response.status_code}")
+        return lease_state(_generation_key(date)) == 'active'
+    except Exception as e:
+        logging.error(f"Failed to check generation lease for {date}: {str(e)}")
+        return False
+
+def is_abandoned_partial(newsletter):
+    """部分发布的简报，但生成流程已经中断（例如进程崩溃），需要重新生成补全"""
+    return not newsletter.is_complete and not is_generation_active(newsletter.date.strftime('%Y-%m-%d'))
+
+def _load_saved_newsletter(date):
+    # 只返回完整的简报：部分发布的内容不能作为生成结果
+    newsletter = get_issue(date, complete_only=True)
+    if newsletter:
+        return {
+            'sections': newsletter.sections,
+            'generated_title': newsletter.generated_title
+        }
+    return None
+
+def generate_newsletter(date):
+    """
+    生成某天的简报，并合并并发请求：
+    同一天只有一个线程/进程真正抓取和翻译，其他请求等待并复用其结果
+    :return: 简报内容，源站尚未发布时为 None
+    :raises IngestError: 生成失败
+    """
+    return run_single_flight(
+        _generation_key(date),
+        lambda: fetch_tldr_content(date),
+        lambda: _load_saved_newsletter(date)
+    )
+
+def _parse_tldr_sections(html, parser=None):
+    """
+    解析 tldr.tech 页面，按页面顺序返回各版块的原始（英文）文章
+    :param parser: 指定解析后端，默认自动选择（见 html_parser）
+    :return: [{'section': str, 'articles': [{'title', 'content', 'url'}]}]
+    """
+    soup = make_soup(html, parser)
+    parsed_sections = []
+    
+    sections = soup.find_all('section')
+    if not sections:
+        logging.warning("No sections found in the page")
+        return parsed_sections
         
-        if response.status_code != 200:
-            logging.warning(f"Failed to fetch content: HTTP {response.status_code}")
-            return None
+    logging.info(f"Found {len(sections)} sections")
+    
+    for section in sections:
+        header = section.find('h3', class_='text-center font-bold')
+        if not header:
+            continue
             
-        soup = BeautifulSoup(response.text, 'html.parser')
-        articles = []
-        
-        sections = soup.find_all('section')
-        if not sections:
-            logging.warning("No sections found in the page")
-            return None
+        section_title = header.text.strip()
+        if "sponsor" in section_title.lower():
+            continue
             
-        logging.info(f"Found {len(sections)} sections")
-        
-        for section in sections:
-            header = section.find('h3', class_='text-center font-bold')
-            if not header:
-                continue
+        raw_articles = []
+        for article in section.find_all('article', class_='mt-3'):
+            try:
+                title_elem = article.find('h3')
+                if not title_elem or "sponsor" in title_elem.text.lower():
+                    continue
+                    
+                title = title_elem.text.strip()
+                
+                # 修改内容提取逻辑，确保只获取文章内容
+                content = article.find('div', class_='newsletter-html')
+                if content:
+                    # 移除所有的 <a> 标签，只保留文本内容
+                    for a in content.find_all('a'):
+                        a.decompose()
+                    content_html = content.get_text(strip=True)
+                else:
+                    content_html = ""
+                    
+                link = article.find('a', class_='font-bold')
+                url = link['href'] if link else ""
+                
+                raw_articles.append({
+                    'title': title,
+                    'content': content_html,
+                    'url': url
+                })
                 
-            section_title = header.text.strip()
-            if "sponsor" in section_title.lower():
+            except Exception as e:
+                logging.error(f"Error parsing article: {str(e)}")
                 continue
                 
+        parsed_sections.append({
+            'section': section_title,
+            'articles': raw_articles
+        })
+        
+    return parsed_sections
+
+def _translate_section(translator, raw_articles, checkpoint):
+    """
+    批量翻译一个版块内尚未翻译的文章，返回与 raw_articles 同序的 (标题, 内容) 列表
+    翻译成功的文章立即写入断点
+    """
+    titles_zh = translator.translate_titles([a['title'] for a in raw_articles])
+    contents_zh = translator.translate_contents([a['content'] for a in raw_articles])
+    
+    for raw_article, title_zh, content_zh in zip(raw_articles, titles_zh, contents_zh):
+        # 翻译出错时返回的是原文，不记为完成，下次重试时继续翻译
+        if (translator.is_translated(raw_article['title'], title_zh)
+                and translator.is_translated(raw_article['content'], content_zh)):
+            checkpoint.save_translation(raw_article, title_zh, content_zh)
+            
+    return list(zip(titles_zh, contents_zh))
+
+def _extract_image(raw_article, checkpoint):
+    image_url = extract_article_image(raw_article['url'])
+    checkpoint.save_image(raw_article, image_url)
+    return image_url
+
+def _process_articles_concurrently(parsed_sections, translator, max_workers, checkpoint, on_section=None):
+    """
+    并发执行所有版块的批量翻译和所有文章的图片提取（有界线程池），
+    已在断点中完成的部分直接复用；
+    结果按原有版块和文章顺序组装；单篇文章失败不影响其他文章
+    :param on_section: 每完成一个版块就用目前已完成的全部版块调用一次，用于先行发布
+    """
+    articles = []
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 先提交全部任务，再按顺序收集结果
+        pending = []
+        for section in parsed_sections:
+            untranslated = [a for a in section['articles'] if not checkpoint.has_translation(a)]
+            translate_future = (
+                executor.submit(_translate_section, translator, untranslated, checkpoint)
+                if untranslated else None
+            )
+            image_futures = [
+                executor.submit(_extract_image, raw_article, checkpoint)
+                if raw_article['url'] and not checkpoint.has_image(raw_article) else None
+                for raw_article in section['articles']
+            ]
+            pending.append((section, untranslated, translate_future, image_futures))
+            
+        for section, untranslated, translate_future, image_futures in pending:
+            section_title = section['section']
             logging.info(f"Processing section: {section_title}")
             section_content = []
             
-            for article in section.find_all('article', class_='mt-3'):
+            try:
+                translated = translate_future.result() if translate_future else []
+            except Exception as e:
+                logging.error(f"Error translating section {section_title}: {str(e)}")
+                continue
+            fresh_translations = {id(a): t for a, t in zip(untranslated, translated)}
+                
+            for raw_article, image_future in zip(section['articles'], image_futures):
                 try:
-                    title_elem = article.find('h3')
-                    if not title_elem or "sponsor" in title_elem.text.lower():
-                        continue
+                    staged = checkpoint.get(raw_article)
+                    if id(raw_article) in fresh_translations:
+                        title_zh, content_html_zh = fresh_translations[id(raw_article)]
+                    else:
+                        title_zh, content_html_zh = staged['title'], staged['content']
                         
-                    title = title_elem.text.strip()
-                    translator = TranslatorService(current_app.config['DEEPSEEK_API_KEY'])
-                    
-                    # 修改内容提取逻辑，确保只获取文章内容
-                    content = article.find('div', class_='newsletter-html')
-                    if content:
-                        # 移除所有的 <a> 标签，只保留文本内容
-                        for a in content.find_all('a'):
-                            a.decompose()
-                        content_html = content.get_text(strip=True)
+                    if image_future:
+                        image_url = image_future.result()
                     else:
-                        content_html = ""
-                    
-                    # 分别翻译标题和内容
-                    title_zh = translator.translate_title(title)
-                    content_html_zh = translator.translate_content(content_html)
-                    
-                    link = article.find('a', class_='font-bold')
-                    url = link['href'] if link else ""
-                    
-                    # 提取文章图片
-                    image_url = extract_article_image(url) if url else None
+                        image_url = staged.get('image_url')
                     
-                    article_content = {
+                    processed_article = {
                         'title': title_zh,
-                        'title_en': title,
+                        'title_en': raw_article['title'],
                         'content': content_html_zh,
-                        'content_en': content_html,
-                        'url': url,
+                        'content_en': raw_article['content'],
+                        'url': raw_article['url'],
                         'image_url': image_url
                     }
-                    section_content.append(article_content)
-                    logging.info(f"Processed article: {title}")
+                    # 展示字段在采集时一次算好，读接口直接使用
+                    processed_article.update(article_display_fields(processed_article))
+                    section_content.append(processed_article)
+                    logging.info(f"Processed article: {raw_article['title']}")
                     
                 except Exception as e:
                     logging.error(f"Error processing article: {str(e)}")
@@ -181,13 +327,158 @@ def fetch_tldr_content(date):
             if section_content:
                 articles.append({
                     'section': section_title,
+                    'section_emoji': get_section_emoji(section_title),
                     'articles': section_content
                 })
+                if on_section:
+                    on_section(list(articles))
+                
+    return articles
 
-        if not articles:
-            logging.warning("No valid articles found")
+def _publish_partial(date, sections):
+    """
+    把已完成的版块以 partial 状态写入 DailyNewsletter，读者无需等待整期生成完毕
+    只更新 partial 文档：完整版本已存在时 upsert 触发唯一索引冲突，不会被覆盖
+    """
+    now = datetime.utcnow()
+    try:
+        DailyNewsletter.objects(date=date, status='partial').update_one(
+            set__sections=sections,
+            set__status='partial',
+            set__updated_at=now,
+            set_on_insert__created_at=now,
+            upsert=True
+        )
+        invalidate_issue(date)
+        advance_latest_issue(date, complete=False)
+        logging.info(f"Published {len(sections)} finished section(s) for {date}")
+    except NotUniqueError:
+        logging.info(f"Complete newsletter already stored for {date}, skipping partial publish")
+    except Exception as e:
+        # 先行发布失败不影响整体采集
+        logging.error(f"Failed to publish partial newsletter for {date}: {str(e)}")
+
+def _refresh_highlights(date, sections):
+    """更新首页各版块最新文章视图；失败不影响采集结果"""
+    try:
+        refresh_section_highlights(date, sections)
+    except Exception as e:
+        logging.error(f"Failed to refresh section highlights for {date}: {str(e)}")
+
+def _update_changed_newsletter(existing, articles, checkpoint, url, response, digest, timings):
+    """源页面有更新时原地更新已入库的简报；文章没有实际变化时不重新生成标题"""
+    date = existing.date.strftime('%Y-%m-%d')
+    # 旧文档没有展示字段，补齐后再比较，避免仅因缺少这些字段而重新生成标题
+    if articles == add_display_fields(existing.sections):
+        logging.info(f"Source page changed but articles are identical for {date}")
+        checkpoint.discard()
+        remember_source_page(url, response, digest)
+        return {
+            'sections': existing.sections,
+            'generated_title': existing.generated_title
+        }
+        
+    title_generator = TitleGeneratorService(os.environ.get('DEEPSEEK_API_KEY'))
+    with _timed_stage(timings, 'title'):
+        generated_title = title_generator.generate_title(articles)
+    _log_stage_timings(date, timings)
+    
+    DailyNewsletter.objects(id=existing.id).update_one(
+        set__sections=articles,
+        set__generated_title=generated_title,
+        set__updated_at=datetime.utcnow()
+    )
+    invalidate_issue(date)
+    advance_latest_issue(date)
+    _refresh_highlights(date, articles)
+    logging.info(f"Updated newsletter for {date} after source page change")
+    checkpoint.discard()
+    remember_source_page(url, response, digest)
+    return {
+        'sections': articles,
+        'generated_title': generated_title
+    }
+
+@contextmanager
+def _timed_stage(timings, stage):
+    """记录某个采集阶段的耗时（秒）"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - started
+
+def _log_stage_timings(date, timings):
+    summary = ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items())
+    logging.info(f"Ingestion timings for {date}: {summary}")
+
+def fetch_tldr_content(date):
+    """
+    抓取、翻译并保存某天的简报
+    对源页面使用条件请求：页面未变化时直接返回已有结果，不再解析和翻译；
+    页面有变化时只重新处理原文发生变化的文章。
+    没有已保存的完整简报（例如被删除）时忽略已记录的校验信息，完整抓取并重新生成
+    :return: 简报内容；源站尚未发布该日期时返回 None
+    :raises IngestError: 网络错误、源站错误或所有文章都处理失败，调用方应记为失败并稍后重试
+    """
+    url = f"https://tldr.tech/tech/{date}"
+    logging.info(f"Fetching content from: {url}")
+    timings = {}
+    
+    try:
+        source_page = get_source_page(url)
+        saved = _load_saved_newsletter(date)
+        if source_page and not saved:
+            logging.info(f"No saved newsletter for {date}, ignoring stored validators: {url}")
+            source_page = None
+        with _timed_stage(timings, 'fetch'):
+            response = http_client.get(url, timeout=10, headers=conditional_headers(source_page))  # 添加超时设置
+        logging.info(f"Response status code: {response.status_code}")
+        
+        if response.status_code == 304:
+            logging.info(f"Source page not modified since last fetch: {url}")
+            touch_source_page(url)
+            return saved
+            
+        if response.status_code == 404:
+            logging.warning(f"Newsletter not published yet: {url}")
+            return None
+        if response.status_code != 200:
+            raise IngestError(f"Failed to fetch content: HTTP {response.status_code}")
+            
+        digest = content_hash(response.content)
+        if is_unchanged(source_page, digest):
+            logging.info(f"Source page content unchanged, skipping parse and translation: {url}")
+            remember_source_page(url, response, digest)
+            return saved
+            
+        with _timed_stage(timings, 'parse'):
+            parsed_sections = _parse_tldr_sections(response.text)
+        if not parsed_sections:
+            remember_source_page(url, response, digest)
             return None
             
+        translator = TranslatorService(current_app.config['DEEPSEEK_API_KEY'])
+        max_workers = current_app.config.get('INGEST_MAX_WORKERS', 8)
+        
+        # 读取上次中断时保存的进度；页面更新时复用已入库文章的翻译和图片
+        checkpoint = IngestCheckpoint(date)
+        existing = DailyNewsletter.complete(date=date).first()
+        if existing:
+            checkpoint.seed_from_sections(existing.sections)
+        
+        # 首次生成时每完成一个版块就先行发布；已有完整版本时整体更新，避免内容回退
+        on_section = None if existing else (lambda sections: _publish_partial(date, sections))
+        with _timed_stage(timings, 'articles'):
+            articles = _process_articles_concurrently(parsed_sections, translator, max_workers, checkpoint, on_section)
+            
+        if not articles:
+            # 页面上有文章但全部翻译或处理失败
+            raise IngestError("No valid articles found")
+            
+        if existing:
+            return _update_changed_newsletter(existing, articles, checkpoint, url, response, digest, timings)
+            
         try:
             # 在所有文章处理完成后，生成标题
             if articles:
@@ -199,41 +490,50 @@ def fetch_tldr_content(date):
                 )
                 
                 # 生成标题
-                generated_title = title_generator.generate_title(articles)
+                with _timed_stage(timings, 'title'):
+                    generated_title = title_generator.generate_title(articles)
                 logging.info(f"生成的标题: {generated_title}")
+                _log_stage_timings(date, timings)
                 
                 # 在返回之前再次检查数据库
                 try:
-                    newsletter = DailyNewsletter.objects(date=date).first()
+                    newsletter = DailyNewsletter.complete(date=date).first()
                     if newsletter:
                         logging.info(f"Another process has saved the newsletter for {date}")
+                        checkpoint.discard()
                         return {
                             'sections': newsletter.sections,
                             'generated_title': newsletter.generated_title
                         }
                     
-                    # 如果数据库中还没有，尝试保存
-                    new_newsletter = DailyNewsletter(
-                        date=date,
-                        sections=articles,
-                        generated_title=generated_title
-                    )
                     try:
-                        new_newsletter.save()
+                        # 所有文章处理完成后把先行发布的 partial 文档（或新文档）标记为完整，再清理暂存进度
+                        now = datetime.utcnow()
+                        DailyNewsletter.objects(date=date, status='partial').update_one(
+                            set__sections=articles,
+                            set__generated_title=generated_title,
+                            set__status='complete',
+                            set__updated_at=now,
+                            set_on_insert__created_at=now,
+                            upsert=True
+                        )
+                        invalidate_issue(date)
+                        advance_latest_issue(date)
+                        _refresh_highlights(date, articles)
                         logging.info(f"Successfully saved newsletter with title to database for {date} ET")
+                        checkpoint.discard()
+                        remember_source_page(url, response, digest)
+                    except NotUniqueError:
+                        # 重复键错误说明另一个进程已经保存了完整数据
+                        logging.info(f"Duplicate key detected, another process likely saved the newsletter for {date}")
+                        saved_newsletter = DailyNewsletter.complete(date=date).first()
+                        if saved_newsletter:
+                            return {
+                                'sections': saved_newsletter.sections,
+                                'generated_title': saved_newsletter.generated_title
+                            }
                     except Exception as e:
-                        # 如果是重复键错误，说明另一个进程已经保存了数据
-                        if "E11000 duplicate key error" in str(e):
-                            logging.info(f"Duplicate key detected, another process likely saved the newsletter for {date}")
-                            # 获取已保存的数据
-                            saved_newsletter = DailyNewsletter.objects(date=date).first()
-                            if saved_newsletter:
-                                return {
-                                    'sections': saved_newsletter.sections,
-                                    'generated_title': saved_newsletter.generated_title
-                                }
-                        else:
-                            logging.error(f"Database save error: {str(e)}")
+                        logging.error(f"Database save error: {str(e)}")
                     
                 except Exception as e:
                     logging.error(f"Final database check error: {str(e)}")
@@ -247,12 +547,11 @@ def fetch_tldr_content(date):
             return None
             
         except Exception as e:
-            logging.error(f"Error fetching content: {str(e)}")
-            return None
+            raise IngestError(f"Error generating newsletter: {str(e)}") from e
         
+    except IngestError:
+        raise
     except requests.RequestException as e:
-        logging.error(f"Request error: {str(e)}")
-        return None
+        raise IngestError(f"Request error: {str(e)}") from e
     except Exception as e:
-        logging.error(f"Error fetching content: {str(e)}")
-        return None
+        raise IngestError(f"Error fetching content: {str(e)}") from e
@@ -0,0 +1,98 @@
+"""
+只读查询
+读接口只需要简报或订阅者的部分字段，用 only() 投影加 as_pymongo() 直接返回原始字典，
+跳过 MongoEngine 对每个 Document（尤其是很大的 sections）的校验和包装。
+需要修改数据的地方仍然使用 Document。
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from ..models.article import DailyNewsletter
+from ..models.subscriber import Subscriber
+
+ISSUE_FIELDS = ('date', 'sections', 'generated_title', 'status', 'updated_at')
+ISSUE_DATE_BATCH_SIZE = 1000
+RECENT_ISSUE_WINDOW_DAYS = 10
+
+class Issue(namedtuple('Issue', ISSUE_FIELDS)):
+    """一期简报的只读视图，属性与 DailyNewsletter 一致"""
+    __slots__ = ()
+
+    @property
+    def is_complete(self):
+        return self.status != 'partial'
+
+    @classmethod
+    def from_son(cls, doc):
+        return cls(
+            date=doc['date'].date(),
+            sections=doc.get('sections', []),
+            generated_title=doc.get('generated_title'),
+            status=doc.get('status'),
+            updated_at=doc.get('updated_at')
+        )
+
+def _issues(complete_only=False):
+    queryset = DailyNewsletter.complete if complete_only else DailyNewsletter.objects
+    return queryset.only(*ISSUE_FIELDS).as_pymongo()
+
+def get_issue(date, complete_only=False):
+    """按日期读取一期简报，不存在时返回 None"""
+    doc = _issues(complete_only).filter(date=date).first()
+    return Issue.from_son(doc) if doc else None
+
+def get_issues_before(date, limit, window_days=RECENT_ISSUE_WINDOW_DAYS, complete_only=False):
+    """
+    截至 date（含）最近的 limit 期，按日期倒序
+    只查询 date 往前 window_days 天内的具体日期（唯一索引等值查询），不对整个集合排序；
+    周末、节假日不出刊，窗口取得比 limit 大。
+    窗口内不足 limit 期（长假、漏采）时回退为按日期倒序的 limit 查询
+    """
+    end = datetime.strptime(date, '%Y-%m-%d')
+    dates = [end - timedelta(days=offset) for offset in range(window_days)]
+    issues = [Issue.from_son(doc) for doc in _issues(complete_only).filter(date__in=dates)]
+    if len(issues) < limit:
+        queryset = _issues(complete_only).filter(date__lte=end).order_by('-date').limit(limit)
+        return [Issue.from_son(doc) for doc in queryset]
+    issues.sort(key=lambda issue: issue.date, reverse=True)
+    return issues[:limit]
+
+def get_latest_issue_date(complete_only=False):
+    """最新一期的日期（YYYY-MM-DD），只读取 date 字段"""
+    queryset = DailyNewsletter.complete if complete_only else DailyNewsletter.objects
+    doc = queryset.order_by('-date').only('date').as_pymongo().first()
+    return doc['date'].strftime('%Y-%m-%d') if doc else None
+
+def get_first_issue_date():
+    """最早一期的日期（YYYY-MM-DD）"""
+    doc = DailyNewsletter.objects.order_by('date').only('date').as_pymongo().first()
+    return doc['date'].strftime('%Y-%m-%d') if doc else None
+
+def iter_issue_dates(start=None, end=None):
+    """
+    按日期倒序逐个产出 [start, end) 范围内的简报日期
+    游标只取 date 字段并分批读取，no_cache 不保留已读结果，内存占用与简报数量无关
+    """
+    queryset = DailyNewsletter.objects
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lt=end)
+    for doc in queryset.order_by('-date').only('date').as_pymongo().no_cache().batch_size(ISSUE_DATE_BATCH_SIZE):
+        yield doc['date'].strftime('%Y-%m-%d')
+
+def get_confirmed_recipients():
+    """已确认订阅者的 {邮箱: id}（发送邮件时作为收件人变量）"""
+    return {
+        doc['email']: str(doc['_id'])
+        for doc in Subscriber.objects(confirmed=True).only('email').as_pymongo()
+    }
+
+def get_subscriber_ids(emails):
+    """一次查询多个邮箱对应的订阅者 id"""
+    return {
+        doc['email']: str(doc['_id'])
+        for doc in Subscriber.objects(email__in=list(emails)).only('email').as_pymongo()
+    }
+
+def count_confirmed_subscribers():
+    return Subscriber.objects(confirmed=True).count()
@@ -0,0 +1,158 @@
+"""
+进程内响应缓存
+按日期缓存 /api/newsletter/<date> 和 /api/wechat/newsletter/<date> 序列化好的 JSON 字节和强 ETag，
+命中时无需查询 MongoDB、构建 Document、重新渲染和序列化。
+- LRU 淘汰，按缓存内容的总字节数（含预压缩的 gzip / brotli 变体）限制大小
+- 写入时压缩一次（见 compression.py），请求时按 Accept-Encoding 直接发送
+- 本进程采集或更新简报时立即失效（invalidate）
+- 其他进程（worker、回填脚本）写入的更新通过定期校验 updated_at 发现：
+  条目超过 NEWSLETTER_CACHE_REVALIDATE_SECONDS 后再次命中时只查询 updated_at 一个字段
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from ..models.article import DailyNewsletter
+from .compression import compress_variants
+from .latest_issue import get_archive_version
+
+NEWSLETTER_CACHE_MAX_BYTES = int(os.environ.get('NEWSLETTER_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+NEWSLETTER_CACHE_REVALIDATE_SECONDS = float(os.environ.get('NEWSLETTER_CACHE_REVALIDATE_SECONDS', 60))
+SITEMAP_CACHE_MAX_BYTES = int(os.environ.get('SITEMAP_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+
+# variants：{编码: 预压缩的字节}
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'version', 'checked_at', 'variants'])
+
+# 校验时文档不存在或不再完整
+MISSING = object()
+
+def make_etag(body):
+    """强 ETag：响应内容的哈希"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def _entry_size(entry):
+    return len(entry.body) + sum(len(variant) for variant in entry.variants.values())
+
+class ResponseCache:
+    """有界 LRU：{key: CachedResponse}，load_version(key) 返回数据源中的当前版本"""
+
+    def __init__(self, load_version, max_bytes=NEWSLETTER_CACHE_MAX_BYTES,
+                 revalidate_seconds=NEWSLETTER_CACHE_REVALIDATE_SECONDS):
+        self.load_version = load_version
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidations': 0,
+            'invalidations': 0,
+            'evictions': 0
+        }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+
+        if time.monotonic() - entry.checked_at >= self.revalidate_seconds:
+            entry = self._revalidate(key, entry)
+            if entry is None:
+                return None
+
+        with self._lock:
+            self._stats['hits'] += 1
+        return entry
+
+    def set(self, key, body, version=None):
+        entry = CachedResponse(body, make_etag(body), version, time.monotonic(), compress_variants(body))
+        if _entry_size(entry) > self.max_bytes:
+            return entry
+
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._size += _entry_size(entry)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= _entry_size(evicted)
+                self._stats['evictions'] += 1
+        return entry
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._discard(key):
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0
+            }
+
+    def _revalidate(self, key, entry):
+        try:
+            version = self.load_version(key)
+        except Exception as e:
+            # 数据库暂时不可用时继续使用缓存内容
+            logging.warning(f"Response cache revalidation failed for {key}: {str(e)}")
+            return entry
+
+        with self._lock:
+            self._stats['revalidations'] += 1
+            if version is MISSING or version != entry.version:
+                if self._entries.get(key) is entry:
+                    self._discard(key)
+                    self._stats['invalidations'] += 1
+                self._stats['misses'] += 1
+                return None
+            entry = entry._replace(checked_at=time.monotonic())
+            if key in self._entries:
+                self._entries[key] = entry
+            return entry
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._size -= _entry_size(entry)
+        return True
+
+def _newsletter_version(date):
+    doc = DailyNewsletter.objects(date=date).only('updated_at', 'status').as_pymongo().first()
+    if not doc or doc.get('status') == 'partial':
+        return MISSING
+    return doc.get('updated_at')
+
+# 已完整生成的简报响应，key 为 YYYY-MM-DD
+newsletter_cache = ResponseCache(_newsletter_version)
+# 公众号接口渲染好的内容（文章列表和 HTML），与简报共用同一个版本
+wechat_cache = ResponseCache(_newsletter_version)
+
+def _sitemap_version(name):
+    # 任意一期写入（包括回填较早的日期）都会改变归档版本，读取经过进程内 TTL 缓存
+    return get_archive_version()
+
+# 生成完成的 sitemap（索引、首页和各年份），key 为 sitemap 名称
+sitemap_cache = ResponseCache(_sitemap_version, max_bytes=SITEMAP_CACHE_MAX_BYTES, revalidate_seconds=0)
+
+def invalidate_issue(date):
+    """某期简报被写入或修改后，使本进程中所有基于它的响应缓存失效"""
+    newsletter_cache.invalidate(date)
+    wechat_cache.invalidate(date)
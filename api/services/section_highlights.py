@@ -0,0 +1,132 @@
+"""
+首页"各版块最新带图文章"的物化视图
+原来每次请求都按日期倒序遍历全部简报；现在采集完成后把新一期合并进 SectionHighlights 文档，
+接口只读取这一个文档，relative_time 在返回时计算
+"""
+import logging
+from datetime import datetime
+import pytz
+from ..models.article import DailyNewsletter
+from ..models.section_highlights import SectionHighlights
+from .emoji_mapper import display_title
+
+# 首页展示的版块
+SECTIONS_TO_SHOW = (
+    'Big Tech & Startups',
+    'Science & Futuristic Technology',
+    'Programming, Design & Data Science',
+    'Miscellaneous',
+    'Quick Links'
+)
+# 每个版块最多展示的文章数
+PER_SECTION = 5
+VIEW_NAME = 'latest'
+# 乐观锁冲突时的最多重试次数
+MAX_MERGE_ATTEMPTS = 3
+
+def _pick_articles(date, sections):
+    """从一期简报中按顺序挑出各版块带图的文章"""
+    picked = {name: [] for name in SECTIONS_TO_SHOW}
+    for section in sections:
+        bucket = picked.get(section['section'])
+        if bucket is None:
+            continue
+        for article in section['articles']:
+            if article.get('image_url') and len(bucket) < PER_SECTION:
+                bucket.append({
+                    'title': display_title(article),
+                    'content': article['content'],
+                    'url': article['url'],
+                    'image_url': article['image_url'],
+                    'date': date
+                })
+    return picked
+
+def _save(sections, version=None):
+    """写入视图；指定 version 时只有版本未变才写入，返回是否成功"""
+    query = {'name': VIEW_NAME}
+    if version is not None:
+        query['version'] = version
+    result = SectionHighlights._get_collection().update_one(
+        query,
+        {
+            '$set': {'sections': sections, 'updated_at': datetime.utcnow()},
+            '$inc': {'version': 1}
+        },
+        upsert=version is None
+    )
+    return result.matched_count > 0 or result.upserted_id is not None
+
+def rebuild_section_highlights():
+    """按日期倒序扫描全部完整简报重建视图，各版块都填满后提前结束"""
+    picked = {name: [] for name in SECTIONS_TO_SHOW}
+    newsletters = DailyNewsletter.complete.order_by('-date').only('date', 'sections').as_pymongo()
+    for newsletter in newsletters:
+        fresh = _pick_articles(newsletter['date'].strftime('%Y-%m-%d'), newsletter.get('sections', []))
+        for name, bucket in picked.items():
+            bucket.extend(fresh[name][:PER_SECTION - len(bucket)])
+        if all(len(bucket) >= PER_SECTION for bucket in picked.values()):
+            break
+            
+    _save(picked)
+    logging.info("Rebuilt section highlights")
+    return picked
+
+def refresh_section_highlights(date, sections):
+    """
+    把某一期（新采集或重新处理的）简报合并进视图：
+    替换该日期原有的条目，再按日期从新到旧截取前 PER_SECTION 条。
+    某个版块的条目变少时，被挤出视图的旧文章可能需要补回，此时整体重建
+    """
+    fresh = _pick_articles(date, sections)
+    collection = SectionHighlights._get_collection()
+    
+    for _ in range(MAX_MERGE_ATTEMPTS):
+        view = collection.find_one({'name': VIEW_NAME})
+        if view is None:
+            return rebuild_section_highlights()
+            
+        current = view.get('sections', {})
+        merged = {}
+        for name in SECTIONS_TO_SHOW:
+            existing = current.get(name, [])
+            others = [entry for entry in existing if entry['date'] != date]
+            # sorted 是稳定排序，同一天的文章保持页面中的顺序
+            combined = sorted(others + fresh[name], key=lambda entry: entry['date'], reverse=True)
+            merged[name] = combined[:PER_SECTION]
+            if len(merged[name]) < len(existing):
+                return rebuild_section_highlights()
+                
+        if _save(merged, view.get('version', 0)):
+            return merged
+        logging.info("Section highlights changed concurrently, retrying merge")
+        
+    return rebuild_section_highlights()
+
+def _relative_time(date, today):
+    days_ago = (today - datetime.strptime(date, '%Y-%m-%d').date()).days
+    if days_ago == 0:
+        return "今天"
+    if days_ago == 1:
+        return "昨天"
+    return f"{days_ago}天前"
+
+def get_section_highlights():
+    """读取视图（不存在时重建），并计算每篇文章的相对时间"""
+    view = SectionHighlights._get_collection().find_one({'name': VIEW_NAME}, {'sections': 1})
+    sections = view.get('sections', {}) if view else rebuild_section_highlights()
+    
+    today = datetime.now(pytz.timezone('US/Eastern')).date()
+    return {
+        name: [
+            {
+                'title': entry['title'],
+                'content': entry['content'],
+                'url': entry['url'],
+                'image_url': entry['image_url'],
+                'relative_time': _relative_time(entry['date'], today)
+            }
+            for entry in sections.get(name, [])
+        ]
+        for name in SECTIONS_TO_SHOW
+    }
@@ -0,0 +1,167 @@
+"""
+请求合并（single-flight）
+同一个 key（例如某天的简报）同一时间只允许一个生成流程：
+- 进程内：同一个 worker 的多个线程共享同一个 Future
+- 跨进程：通过 MongoDB 中的租约文档选出唯一的生成者，其他进程轮询结果；
+  生成期间后台线程定期续约，耗时超过 LEASE_SECONDS 的生成（LLM 慢、重试多）不会被其他进程接管
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from ..models.lease import GenerationLease
+
+# 租约时长：持有者崩溃（停止续约）后最多等待这么久即可被接管；
+# 生成期间每隔 LEASE_RENEW_SECONDS 续约一次，因此不需要覆盖最坏情况下的生成耗时
+LEASE_SECONDS = int(os.environ.get('GENERATION_LEASE_SECONDS', 300))
+LEASE_RENEW_SECONDS = LEASE_SECONDS / 3
+# 非生成者最多等待多久
+WAIT_SECONDS = int(os.environ.get('GENERATION_WAIT_SECONDS', 100))
+POLL_INTERVAL = 1.0
+
+OWNER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def acquire_lease(key, seconds=LEASE_SECONDS):
+    """
+    尝试获取租约：不存在或已过期时获取成功
+    利用唯一索引保证原子性——租约未过期时 upsert 会触发重复键错误
+    """
+    now = datetime.utcnow()
+    try:
+        GenerationLease._get_collection().find_one_and_update(
+            {'key': key, 'expires_at': {'$lt': now}},
+            {'$set': {
+                'owner': OWNER_ID,
+                'acquired_at': now,
+                'expires_at': now + timedelta(seconds=seconds)
+            }},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+def renew_lease(key, seconds=LEASE_SECONDS):
+    """延长自己持有的租约，租约已被他人接管时返回 False"""
+    result = GenerationLease._get_collection().update_one(
+        {'key': key, 'owner': OWNER_ID},
+        {'$set': {'expires_at': datetime.utcnow() + timedelta(seconds=seconds)}}
+    )
+    return result.matched_count > 0
+
+@contextmanager
+def keep_alive(renew, interval, name):
+    """
+    with 块执行期间由后台线程每隔 interval 秒调用一次 renew() 续约
+    :param renew: 续约函数，返回 False 表示租约已被他人接管，此后不再续约
+    """
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(interval):
+            try:
+                if not renew():
+                    logging.warning(f"Lease for {name} was lost, another worker may take over")
+                    return
+            except Exception as e:
+                # 暂时无法续约时继续重试，租约在到期前仍然有效
+                logging.error(f"Failed to renew lease for {name}: {str(e)}")
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    try:
+        yield
+    finally:
+        stopped.set()
+
+def release_lease(key):
+    GenerationLease._get_collection().delete_one({'key': key, 'owner': OWNER_ID})
+
+def lease_state(key):
+    """
+    :return: 'active'（有人持有）、'expired'（持有者可能已崩溃）或 'released'（已正常释放）
+    """
+    lease = GenerationLease.objects(key=key).only('expires_at').first()
+    if lease is None:
+        return 'released'
+    return 'active' if lease.expires_at > datetime.utcnow() else 'expired'
+
+def run_single_flight(key, generate, load_existing, wait_seconds=WAIT_SECONDS):
+    """
+    对同一个 key 只执行一次 generate()
+    :param generate: 生成函数，只会在获得租约的进程中执行
+    :param load_existing: 读取已生成结果的函数，没有结果时返回 None
+    :return: generate() 的结果，或等待期间由其他进程生成的结果；超时返回 None
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
+            
+    if not is_leader:
+        logging.info(f"Joining in-process generation for {key}")
+        return future.result(timeout=wait_seconds)
+        
+    try:
+        result = _run_with_lease(key, generate, load_existing, wait_seconds)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def _run_with_lease(key, generate, load_existing, wait_seconds):
+    deadline = time.monotonic() + wait_seconds
+    
+    while True:
+        try:
+            acquired = acquire_lease(key)
+        except Exception as e:
+            # 租约存储不可用时退化为只做进程内合并
+            logging.error(f"Lease acquisition failed for {key}, generating without lease: {str(e)}")
+            return generate()
+            
+        if acquired:
+            logging.info(f"Acquired generation lease for {key}")
+            try:
+                with keep_alive(lambda: renew_lease(key), LEASE_RENEW_SECONDS, key):
+                    return generate()
+            finally:
+                try:
+                    release_lease(key)
+                except Exception as e:
+                    logging.error(f"Failed to release lease for {key}: {str(e)}")
+                    
+        logging.info(f"Another worker is generating {key}, waiting for its result")
+        state = 'active'
+        while time.monotonic() < deadline:
+            existing = load_existing()
+            if existing is not None:
+                return existing
+            state = lease_state(key)
+            if state != 'active':
+                break
+            time.sleep(POLL_INTERVAL)
+        else:
+            logging.warning(f"Timed out waiting for {key}")
+            return None
+            
+        # 对方正常结束：以它写入的结果为准（没有结果说明生成失败，不再重复尝试）
+        existing = load_existing()
+        if existing is not None or state == 'released':
+            return existing
+        # 租约过期说明持有者可能已崩溃，下一轮循环尝试接管
+        logging.warning(f"Generation lease for {key} expired, taking over")
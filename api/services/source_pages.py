@@ -0,0 +1,55 @@
+"""
+源页面条件请求与变更检测
+记录每个源 URL 的 ETag、Last-Modified 和内容哈希：
+- 发送 If-None-Match / If-Modified-Since，304 时无需下载和解析
+- 200 但内容哈希未变时同样跳过解析和翻译
+"""
+import hashlib
+import logging
+from datetime import datetime
+from ..models.source_page import SourcePage
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+def get_source_page(url):
+    try:
+        return SourcePage.objects(url=url).first()
+    except Exception as e:
+        logging.warning(f"Failed to load source page validators for {url}: {str(e)}")
+        return None
+
+def conditional_headers(source_page):
+    headers = {}
+    if source_page:
+        if source_page.etag:
+            headers['If-None-Match'] = source_page.etag
+        if source_page.last_modified:
+            headers['If-Modified-Since'] = source_page.last_modified
+    return headers
+
+def is_unchanged(source_page, digest):
+    return bool(source_page and source_page.content_hash == digest)
+
+def remember_source_page(url, response, digest):
+    """处理成功后保存校验信息（失败时不保存，下次会完整重新抓取）"""
+    now = datetime.utcnow()
+    updates = {
+        'set__etag': response.headers.get('ETag'),
+        'set__last_modified': response.headers.get('Last-Modified'),
+        'set__fetched_at': now
+    }
+    try:
+        previous = SourcePage.objects(url=url).only('content_hash').first()
+        if not previous or previous.content_hash != digest:
+            updates['set__content_hash'] = digest
+            updates['set__changed_at'] = now
+        SourcePage.objects(url=url).update_one(upsert=True, **updates)
+    except Exception as e:
+        logging.warning(f"Failed to save source page validators for {url}: {str(e)}")
+
+def touch_source_page(url):
+    try:
+        SourcePage.objects(url=url).update_one(set__fetched_at=datetime.utcnow())
+    except Exception as e:
+        logging.warning(f"Failed to update source page {url}: {str(e)}")
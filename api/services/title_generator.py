@@ -1,14 +1,13 @@
 import logging
 from typing import List, Dict, Optional
-from openai import OpenAI
+from .llm_clients import get_llm_client
+from .llm_limiter import create_chat_completion
 
 class TitleGeneratorService:
     def __init__(self, api_key: str):
         """初始化 DeepSeek 服务"""
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com"
-        )
+        # 复用进程内共享的客户端和连接池
+        self.client = get_llm_client(api_key)
 
     def _extract_titles_by_section(self, articles: List[Dict]) -> Dict[str, List[str]]:
         """从各个版块提取中文标题"""
@@ -72,7 +71,8 @@ class TitleGeneratorService:
             """
             
             # 调用 DeepSeek API
-            response = self.client.chat.completions.create(
+            response = create_chat_completion(
+                self.client,
                 model="deepseek-chat",
                 messages=[
                     {"role": "system", "content": "你是一个专业的科技新闻编辑，擅长生成引人注目的新闻标题。"},
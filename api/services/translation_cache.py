@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from ..models.translation_cache import CachedTranslation
+
+def prompt_version(system_prompt: str) -> str:
+    """提示词版本：直接取提示词内容的短哈希，修改提示词后旧缓存自然失效"""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:12]
+
+def make_cache_key(text: str, version: str, model: str) -> str:
+    """内容寻址的缓存 key：sha256(模型 + 提示词版本 + 原文)"""
+    raw = f"{model}\0{version}\0{text}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class TranslationCache:
+    """
+    两级翻译缓存：进程内有界 LRU + MongoDB 持久化
+    MongoDB 不可用时（例如没有应用上下文）自动退化为仅内存缓存
+    """
+    
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'misses': 0,
+            'writes': 0
+        }
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """批量查询，返回命中的 {key: 译文}"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self._stats['memory_hits'] += len(found)
+        
+        missing = [key for key in keys if key not in found]
+        db_hits = 0
+        if missing:
+            try:
+                for entry in CachedTranslation.objects(key__in=missing).only('key', 'translated'):
+                    found[entry.key] = entry.translated
+                    self._remember(entry.key, entry.translated)
+                    db_hits += 1
+            except Exception as e:
+                logging.warning(f"Translation cache lookup failed: {str(e)}")
+        
+        with self._lock:
+            self._stats['db_hits'] += db_hits
+            self._stats['misses'] += len(missing) - db_hits
+            
+        return found
+    
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+    
+    def set(self, key: str, translated: str, kind: str = None, model: str = None):
+        """写入两级缓存；持久化失败只记录日志，不影响翻译结果"""
+        self._remember(key, translated)
+        with self._lock:
+            self._stats['writes'] += 1
+        
+        try:
+            CachedTranslation.objects(key=key).update_one(
+                set_on_insert__kind=kind,
+                set_on_insert__model=model,
+                set__translated=translated,
+                upsert=True
+            )
+        except Exception as e:
+            logging.warning(f"Translation cache write failed: {str(e)}")
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_size'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+    
+    def clear(self):
+        """只清空进程内缓存和计数"""
+        with self._lock:
+            self._memory.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+    
+    def _remember(self, key: str, translated: str):
+        with self._lock:
+            self._memory[key] = translated
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+# 进程内共享的缓存实例
+translation_cache = TranslationCache(int(os.environ.get('TRANSLATION_CACHE_SIZE', 2048)))
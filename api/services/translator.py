@@ -1,14 +1,48 @@
 import time
+import json
+import re
 from functools import lru_cache
 import logging
-from openai import OpenAI
+from typing import List, Optional
+from .llm_clients import get_llm_client
+from .llm_limiter import create_chat_completion
+from .translation_cache import translation_cache, make_cache_key, prompt_version
+
+TITLE_SYSTEM_PROMPT = """你是一个专业的翻译专家。请遵循以下规则：
+1. 严格按照原文内容翻译标题，不要添加任何推测或补充的信息
+2. 保持标题简洁明了，与原文长度相当
+3. 保持新闻标题的简洁性，不要扩充解释
+4. 如果不确定某个词的含义，保持原文
+5. 使用地道的中文表达，但不要过度诠释
+6. 直接返回翻译结果，不要添加任何说明文字"""
+
+CONTENT_SYSTEM_PROMPT = """你是一个专业的翻译专家。请遵循以下规则：
+1. 严格按照原文内容翻译，不要添加任何推测或补充的信息
+2. 保持翻译简洁明了，与原文长度相当
+3. 如果不确定某个词的含义，保持原文
+4. 使用地道的中文表达，但不要过度诠释
+5. 直接返回翻译结果，不要添加任何说明文字"""
+
+# 批量翻译时追加在系统提示词后面的格式要求
+BATCH_FORMAT_RULES = """
+批量模式：用户会给出一个 JSON 字符串数组，请逐条翻译，
+并且只返回一个同样长度、同样顺序的 JSON 字符串数组，不要合并、拆分或省略任何一项，
+不要添加代码块标记或任何说明文字。"""
+
+MODEL = "deepseek-chat"
+TITLE_PROMPT_VERSION = prompt_version(TITLE_SYSTEM_PROMPT)
+CONTENT_PROMPT_VERSION = prompt_version(CONTENT_SYSTEM_PROMPT)
 
 class TranslatorService:
-    def __init__(self, api_key):
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com"
-        )
+    # 每次批量请求最多包含的条目数（内容较长，批次更小以免超出输出 token 上限）
+    TITLE_BATCH_SIZE = 40
+    CONTENT_BATCH_SIZE = 8
+    
+    def __init__(self, api_key, cache=translation_cache):
+        # 复用进程内共享的客户端和连接池
+        self.client = get_llm_client(api_key)
+        # 翻译缓存（None 表示不使用缓存）
+        self.cache = cache
     
     def translate_title(self, title: str) -> str:
         """
@@ -21,18 +55,19 @@ class TranslatorService:
             # 检查是否包含 "minute read" 并标准化翻译
             title = self._standardize_minute_read(title)
             
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+            cache_key = make_cache_key(title, TITLE_PROMPT_VERSION, MODEL)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logging.info(f"翻译缓存命中: {cached}")
+                return cached
+            
+            response = create_chat_completion(
+                self.client,
+                model=MODEL,
                 messages=[
                     {
                         "role": "system",
-                        "content": """你是一个专业的翻译专家。请遵循以下规则：
-1. 严格按照原文内容翻译标题，不要添加任何推测或补充的信息
-2. 保持标题简洁明了，与原文长度相当
-3. 保持新闻标题的简洁性，不要扩充解释
-4. 如果不确定某个词的含义，保持原文
-5. 使用地道的中文表达，但不要过度诠释
-6. 直接返回翻译结果，不要添加任何说明文字"""
+                        "content": TITLE_SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
@@ -47,6 +82,7 @@ class TranslatorService:
             # Log translated title
             logging.info(f"翻译结果: {translated_title}")
             
+            self._cache_set(cache_key, translated_title, 'title')
             return translated_title
             
         except Exception as e:
@@ -63,17 +99,19 @@ class TranslatorService:
             content_preview = content[:100] + "..." if len(content) > 100 else content
             logging.info(f"开始翻译内容: {content_preview}")
             
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
+            cache_key = make_cache_key(content, CONTENT_PROMPT_VERSION, MODEL)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logging.info("翻译缓存命中")
+                return cached
+            
+            response = create_chat_completion(
+                self.client,
+                model=MODEL,
                 messages=[
                     {
                         "role": "system",
-                        "content": """你是一个专业的翻译专家。请遵循以下规则：
-1. 严格按照原文内容翻译，不要添加任何推测或补充的信息
-2. 保持翻译简洁明了，与原文长度相当
-3. 如果不确定某个词的含义，保持原文
-4. 使用地道的中文表达，但不要过度诠释
-5. 直接返回翻译结果，不要添加任何说明文字"""
+                        "content": CONTENT_SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
@@ -89,6 +127,7 @@ class TranslatorService:
             translated_preview = translated_content[:100] + "..." if len(translated_content) > 100 else translated_content
             logging.info(f"翻译结果: {translated_preview}")
             
+            self._cache_set(cache_key, translated_content, 'content')
             return translated_content
             
         except Exception as e:
@@ -96,6 +135,150 @@ class TranslatorService:
             logging.error(f"错误信息: {str(e)}")
             return content
     
+    def translate_titles(self, titles: List[str]) -> List[str]:
+        """
+        批量翻译标题：一次请求翻译多条标题，结果与输入等长、同序
+        无法解析的条目会回退为逐条调用 translate_title
+        """
+        standardized = [self._standardize_minute_read(title) for title in titles]
+        translated = self._translate_batch(
+            standardized,
+            TITLE_SYSTEM_PROMPT,
+            TITLE_PROMPT_VERSION,
+            'title',
+            self.TITLE_BATCH_SIZE,
+            max_tokens=4000
+        )
+        return [
+            result if result is not None else self.translate_title(title)
+            for title, result in zip(titles, translated)
+        ]
+    
+    def translate_contents(self, contents: List[str]) -> List[str]:
+        """
+        批量翻译内容：一次请求翻译多段内容，结果与输入等长、同序
+        无法解析的条目会回退为逐条调用 translate_content
+        """
+        translated = self._translate_batch(
+            contents,
+            CONTENT_SYSTEM_PROMPT,
+            CONTENT_PROMPT_VERSION,
+            'content',
+            self.CONTENT_BATCH_SIZE,
+            max_tokens=8000
+        )
+        return [
+            result if result is not None else self.translate_content(content)
+            for content, result in zip(contents, translated)
+        ]
+    
+    def _translate_batch(self, texts: List[str], system_prompt: str, version: str, kind: str,
+                         batch_size: int, max_tokens: int) -> List[Optional[str]]:
+        """
+        先查缓存，再把未命中的条目按 batch_size 分批发送 JSON 数组请求
+        缓存 key 与逐条翻译一致，批量和逐条的结果可以互相复用
+        :return: 与 texts 等长的列表，翻译失败或无法解析的位置为 None
+        """
+        # 空字符串无需翻译，直接原样返回
+        results: List[Optional[str]] = [
+            None if text and text.strip() else text
+            for text in texts
+        ]
+        pending = [i for i, text in enumerate(texts) if text and text.strip()]
+        
+        keys = {i: make_cache_key(texts[i], version, MODEL) for i in pending}
+        cached = self.cache.get_many(keys.values()) if self.cache else {}
+        if cached:
+            for i in pending:
+                results[i] = cached.get(keys[i])
+            pending = [i for i in pending if results[i] is None]
+            logging.info(f"批量翻译缓存命中 {len(keys) - len(pending)} 条")
+        
+        for start in range(0, len(pending), batch_size):
+            indexes = pending[start:start + batch_size]
+            batch = [texts[i] for i in indexes]
+            
+            try:
+                logging.info(f"开始批量翻译 {len(batch)} 条")
+                response = create_chat_completion(
+                    self.client,
+                    model=MODEL,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": system_prompt + BATCH_FORMAT_RULES
+                        },
+                        {
+                            "role": "user",
+                            "content": json.dumps(batch, ensure_ascii=False)
+                        }
+                    ],
+                    temperature=0.3,
+                    max_tokens=max_tokens
+                )
+                
+                translated = self._parse_batch_response(
+                    response.choices[0].message.content,
+                    len(batch)
+                )
+                if translated is None:
+                    logging.warning(f"批量翻译结果无法解析或条数不符，回退为逐条翻译（{len(batch)} 条）")
+                    continue
+                    
+                for i, item in zip(indexes, translated):
+                    results[i] = item
+                    if item is not None:
+                        self._cache_set(keys[i], item, kind)
+                    
+            except Exception as e:
+                logging.error(f"批量翻译错误，回退为逐条翻译: {str(e)}")
+                continue
+                
+        return results
+    
+    def is_translated(self, source: str, translated: str) -> bool:
+        """
+        判断是否真正翻译成功：出错时各翻译方法会返回（标准化后的）原文
+        """
+        if not source or not source.strip():
+            return True
+        return translated not in (source, self._standardize_minute_read(source))
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        return self.cache.get(key) if self.cache else None
+    
+    def _cache_set(self, key: str, translated: str, kind: str):
+        if self.cache:
+            self.cache.set(key, translated, kind=kind, model=MODEL)
+    
+    @staticmethod
+    def _parse_batch_response(raw: str, expected_count: int) -> Optional[List[Optional[str]]]:
+        """
+        解析模型返回的 JSON 数组
+        :return: 条数匹配时返回列表（单条为空或非字符串的位置为 None），否则返回 None
+        """
+        if not raw:
+            return None
+            
+        text = raw.strip()
+        # 去掉模型偶尔附带的 ```json 代码块标记
+        fenced = re.match(r'^```(?:json)?\s*(.*?)\s*```$', text, re.DOTALL)
+        if fenced:
+            text = fenced.group(1)
+            
+        try:
+            items = json.loads(text)
+        except ValueError:
+            return None
+            
+        if not isinstance(items, list) or len(items) != expected_count:
+            return None
+            
+        return [
+            item.strip() if isinstance(item, str) and item.strip() else None
+            for item in items
+        ]
+    
     def _standardize_minute_read(self, text):
         """
         标准化处理 "minute read" 的表达
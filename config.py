@@ -29,6 +29,9 @@ class BaseConfig:
     NEWSLETTER_API_KEY = os.environ.get('NEWSLETTER_API_KEY')
     ERNIE_API_KEY = os.environ.get('ERNIE_API_KEY')  # 百度文心一言 API Key
     ERNIE_SECRET_KEY = os.environ.get('ERNIE_SECRET_KEY')  # 百度文心一言 Secret Key
+    INGEST_MAX_WORKERS = int(os.environ.get('INGEST_MAX_WORKERS', 8))  # 采集时翻译/图片提取的并发线程数
+    # 开启后，数据库中没有的日期不再在请求中同步生成，而是入队交给 worker.py 并返回 202
+    ASYNC_INGESTION = os.environ.get('ASYNC_INGESTION', 'false').lower() == 'true'
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True  # 开发环境开启调试模式
@@ -0,0 +1,241 @@
+"""
+按日期范围并行回填
+
+用法：
+    python scripts/backfill.py --start 2024-01-01 --end 2024-12-31 --task ingest
+    python scripts/backfill.py --start 2024-01-01 --end 2024-12-31 --task images --workers 8 --per-host 2
+    python scripts/backfill.py --start 2024-06-01 --end 2024-06-30 --task retranslate --llm-concurrency 4
+    python scripts/backfill.py --start 2023-01-01 --end 2024-12-31 --task display --workers 8
+
+任务类型：
+    ingest       采集数据库中缺失的日期
+    images       为缺少图片的文章补充图片
+    retranslate  根据英文原文重新翻译标题和内容（默认不读取翻译缓存，--use-cache 读取；翻译失败的条目保持不变）
+    display      为旧简报补充展示字段（去掉阅读时长的英文标题、emoji 标题和版块名）
+
+进度保存在 backfill_cursors 集合中，中断后使用相同参数重新运行即可从断点继续（--restart 重新开始）。
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import create_app
+from api.models.article import DailyNewsletter
+from api.models.backfill import BackfillCursor
+from api.services import http_client, llm_limiter
+from api.services.emoji_mapper import article_display_fields, missing_display_fields
+from api.services.image_extractor import extract_article_image
+from api.services.newsletter import generate_newsletter
+from api.services.section_highlights import refresh_section_highlights
+from api.services.latest_issue import advance_latest_issue
+from api.services.translator import TranslatorService
+from api.services.translation_cache import translation_cache
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TASKS = ('ingest', 'images', 'retranslate', 'display')
+
+class Progress:
+    """线程安全的进度与预计剩余时间"""
+    
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def advance(self, date, outcome, ok=True):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            elapsed = time.monotonic() - self.started
+            rate = self.done / elapsed if elapsed else 0
+            remaining = (self.total - self.done) / rate if rate else 0
+            logger.info(
+                f"[{self.done}/{self.total}] {self.done / self.total:.1%} {date}: {outcome} "
+                f"| {rate:.2f} dates/s, ETA {timedelta(seconds=int(remaining))}"
+            )
+
+def date_range(start, end):
+    current = datetime.strptime(start, '%Y-%m-%d').date()
+    last = datetime.strptime(end, '%Y-%m-%d').date()
+    while current <= last:
+        yield current.strftime('%Y-%m-%d')
+        current += timedelta(days=1)
+
+def ingest_date(date, args):
+    if DailyNewsletter.complete(date=date).count():
+        return 'already stored'
+    result = generate_newsletter(date)
+    return 'ingested' if result else 'no issue'
+
+def fill_images(date, args):
+    newsletter = DailyNewsletter.objects(date=date).only('id', 'sections').first()
+    if not newsletter:
+        return 'no issue'
+        
+    updates = {}
+    for i, section in enumerate(newsletter.sections):
+        for j, article in enumerate(section['articles']):
+            if article.get('image_url') or not article.get('url'):
+                continue
+            image_url = extract_article_image(article['url'])
+            if image_url:
+                updates[f'sections.{i}.articles.{j}.image_url'] = image_url
+                
+    # 只更新变化的字段，而不是保存整个文档；updated_at 让各进程的响应缓存失效
+    if updates:
+        DailyNewsletter._get_collection().update_one(
+            {'_id': newsletter.id},
+            {'$set': {**updates, 'updated_at': datetime.utcnow()}}
+        )
+        _after_update(date)
+    return f'{len(updates)} images added'
+
+def retranslate(date, args):
+    newsletter = DailyNewsletter.objects(date=date).only('id', 'sections').first()
+    if not newsletter:
+        return 'no issue'
+        
+    # 默认绕过翻译缓存：否则大多只会读回缓存中原来的译文
+    translator = TranslatorService(args.api_key, cache=translation_cache if args.use_cache else None)
+    positions, titles, contents = [], [], []
+    for i, section in enumerate(newsletter.sections):
+        for j, article in enumerate(section['articles']):
+            positions.append((i, j))
+            titles.append(article.get('title_en', ''))
+            contents.append(article.get('content_en', ''))
+            
+    titles_zh = translator.translate_titles(titles)
+    contents_zh = translator.translate_contents(contents)
+    
+    updates = {}
+    for (i, j), title_zh, content_zh in zip(positions, titles_zh, contents_zh):
+        article = newsletter.sections[i]['articles'][j]
+        # 翻译失败时返回的是英文原文，不能覆盖已有的中文
+        if title_zh != article.get('title') and translator.is_translated(article.get('title_en', ''), title_zh):
+            updates[f'sections.{i}.articles.{j}.title'] = title_zh
+            # 标题变了，展示字段也要随之更新
+            for field, value in article_display_fields({**article, 'title': title_zh}).items():
+                updates[f'sections.{i}.articles.{j}.{field}'] = value
+        if content_zh != article.get('content') and translator.is_translated(article.get('content_en', ''), content_zh):
+            updates[f'sections.{i}.articles.{j}.content'] = content_zh
+            
+    if updates:
+        DailyNewsletter._get_collection().update_one(
+            {'_id': newsletter.id},
+            {'$set': {**updates, 'updated_at': datetime.utcnow()}}
+        )
+        _after_update(date)
+    return f'{len(updates)} fields updated'
+
+def fill_display_fields(date, args):
+    newsletter = DailyNewsletter.objects(date=date).only('id', 'sections').first()
+    if not newsletter:
+        return 'no issue'
+        
+    updates = missing_display_fields(newsletter.sections)
+    if updates:
+        DailyNewsletter._get_collection().update_one(
+            {'_id': newsletter.id},
+            {'$set': {**updates, 'updated_at': datetime.utcnow()}}
+        )
+        _after_update(date)
+    return f'{len(updates)} display fields added'
+
+def _after_update(date):
+    """回填修改了已入库的简报后，同步更新首页各版块最新文章视图和最新一期的版本"""
+    newsletter = DailyNewsletter.objects(date=date).only('sections').first()
+    if newsletter:
+        refresh_section_highlights(date, newsletter.sections)
+        advance_latest_issue(date)
+
+HANDLERS = {
+    'ingest': ingest_date,
+    'images': fill_images,
+    'retranslate': retranslate,
+    'display': fill_display_fields
+}
+
+def load_cursor(args):
+    name = args.cursor or f"{args.task}:{args.start}:{args.end}"
+    if args.restart:
+        BackfillCursor.objects(name=name).delete()
+    BackfillCursor.objects(name=name).update_one(
+        set_on_insert__task=args.task,
+        set_on_insert__start=args.start,
+        set_on_insert__end=args.end,
+        set_on_insert__created_at=datetime.utcnow(),
+        upsert=True
+    )
+    return BackfillCursor.objects(name=name).first()
+
+def run(args):
+    app = create_app()
+    
+    http_client.set_max_per_host(args.per_host)
+    llm_limiter.set_max_concurrency(args.llm_concurrency)
+    
+    with app.app_context():
+        cursor = load_cursor(args)
+        completed = set(cursor.completed)
+        dates = [d for d in date_range(args.start, args.end) if d not in completed]
+        if args.newest_first:
+            dates.reverse()
+        logger.info(f"Backfill {args.task}: {len(dates)} dates to process ({len(completed)} already done)")
+        if not dates:
+            return
+            
+        progress = Progress(len(dates))
+        handler = HANDLERS[args.task]
+        
+        def process(date):
+            # 每个线程都需要自己的应用上下文
+            with app.app_context():
+                return handler(date, args)
+                
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {executor.submit(process, date): date for date in dates}
+            for future in as_completed(futures):
+                date = futures[future]
+                try:
+                    outcome = future.result()
+                    BackfillCursor.objects(id=cursor.id).update_one(
+                        add_to_set__completed=date,
+                        set__updated_at=datetime.utcnow()
+                    )
+                    progress.advance(date, outcome)
+                except Exception as e:
+                    progress.advance(date, f"failed: {str(e)}", ok=False)
+                    
+        logger.info(f"Backfill finished: {progress.done - progress.failed} ok, {progress.failed} failed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel date-range backfill")
+    parser.add_argument('--start', required=True, help='YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='YYYY-MM-DD')
+    parser.add_argument('--task', required=True, choices=TASKS)
+    parser.add_argument('--workers', type=int, default=4, help='同时处理的日期数')
+    parser.add_argument('--per-host', type=int, default=4, help='每个外部主机的最大并发请求数（0 不限制）')
+    parser.add_argument('--llm-concurrency', type=int, default=8, help='DeepSeek 最大并发请求数（自适应控制的上限，0 使用默认值）')
+    parser.add_argument('--cursor', help='游标名称，默认由任务和日期范围生成')
+    parser.add_argument('--restart', action='store_true', help='忽略已有进度，从头开始')
+    parser.add_argument('--newest-first', action='store_true', help='从最近的日期开始处理')
+    parser.add_argument('--use-cache', action='store_true', help='retranslate 时读取翻译缓存（默认绕过缓存，重新调用模型）')
+    args = parser.parse_args()
+    args.api_key = os.environ.get('DEEPSEEK_API_KEY')
+    run(args)
+
+if __name__ == "__main__":
+    main()
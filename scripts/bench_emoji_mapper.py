@@ -0,0 +1,122 @@
+"""
+emoji_mapper 微基准测试与一致性检查
+
+用法：
+    python scripts/bench_emoji_mapper.py [--titles 5000] [--iterations 5]
+
+与原来的逐个关键词检查 / 逐个 re.sub 实现（下面的 reference_*）对比：
+先在随机生成的标题上检查结果完全一致（不一致时以非零状态码退出），
+再分别测量未命中缓存（预处理后的匹配本身）和命中缓存时的每次调用耗时。
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services import emoji_mapper
+from api.services.emoji_mapper import SECTION_EMOJI_MAP, TITLE_KEYWORD_EMOJI_MAP
+
+def reference_section_emoji(section_title):
+    if any(ord(c) > 0x1F000 for c in section_title):
+        return section_title
+    for key, emoji in SECTION_EMOJI_MAP.items():
+        if key.lower() in section_title.lower():
+            return f"{emoji} {section_title}"
+    return section_title
+
+def reference_title_emoji(title):
+    if any(ord(c) > 0x1F000 for c in title):
+        return title
+    for key, emoji in TITLE_KEYWORD_EMOJI_MAP.items():
+        if key.lower() in title.lower():
+            return f"{emoji} {title}"
+    return title
+
+def reference_clean_reading_time(title):
+    if not title:
+        return title
+    patterns = [
+        r'\s*\([0-9]+ (?:minute|分钟).*?\)',
+        r'\s*\（[0-9]+ (?:minute|分钟).*?\）',
+        r'\s*\([0-9]+(?:m|min).*?\)',
+        r'\s*\（[0-9]+(?:m|min).*?\）',
+        r'\s*[（(][0-9]+ ?分钟(?:阅读)?[)）]',
+        r'\s*（.*?(?:分钟|minute).*?）',
+        r'\s*\(.*?(?:分钟|minute).*?\)',
+    ]
+    for pattern in patterns:
+        title = re.sub(pattern, '', title)
+    return title.strip()
+
+WORDS = [
+    'new', 'launches', 'raises', 'model', 'startup', 'chip', 'report', '发布', '融资', '芯片', '模型', '报告',
+    'the', 'and', 'for', '推出', '宣布', 'open-source', 'agents', 'robotaxi', 'cloudflare', 'ai', 'Ai',
+    'Apple', 'GOOGLE', 'meta', 'uk', 'iOS', '云', '苹果', '机器人出租车', 'SpaceX', 'Digital', '🚀'
+]
+READING_TIMES = [
+    '', ' (5 minute read)', ' (12 minutes read)', '（阅读时长3分钟）', ' (5m read)', ' (GitHub Repo)',
+    ' (3 分钟阅读)', '（5分钟）', ' (Sponsor)', ' (8min)', ' (1 minute read) (GitHub Repo)', '（2 minute）',
+    ' (read 4 minutes)', ' ((3 minute read))', '(10分钟阅读)'
+]
+SECTIONS = list(SECTION_EMOJI_MAP) + [
+    'Big Tech & Startups', 'Science & Futuristic Technology', 'Programming, Design & Data Science',
+    'Miscellaneous', 'Quick Links', 'Headlines', '🚀 Startups'
+]
+
+def make_titles(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 10))) + rng.choice(READING_TIMES)
+        for _ in range(count)
+    ]
+
+def check(name, reference, optimized, inputs):
+    mismatches = [(value, reference(value), optimized(value)) for value in inputs if reference(value) != optimized(value)]
+    for value, expected, actual in mismatches[:5]:
+        print(f"  MISMATCH {name}: {value!r}: expected {expected!r}, got {actual!r}")
+    return not mismatches
+
+def bench(func, inputs, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for value in inputs:
+            func(value)
+    return (time.perf_counter() - started) / (iterations * len(inputs)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark emoji_mapper matchers")
+    parser.add_argument('--titles', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles)
+    cases = [
+        ('get_title_emoji', reference_title_emoji, emoji_mapper.get_title_emoji, titles),
+        ('clean_reading_time', reference_clean_reading_time, emoji_mapper.clean_reading_time, titles),
+        ('get_section_emoji', reference_section_emoji, emoji_mapper.get_section_emoji, SECTIONS)
+    ]
+
+    ok = True
+    print(f"{args.titles} titles, {args.iterations} iterations")
+    print(f"{'function':<22}{'reference us':>14}{'optimized us':>14}{'cached us':>11}{'speedup':>9}")
+    for name, reference, optimized, inputs in cases:
+        ok = check(name, reference, optimized.__wrapped__, inputs) and ok
+        reference_us = bench(reference, inputs, args.iterations)
+        compiled_us = bench(optimized.__wrapped__, inputs, args.iterations)
+        # 缓存命中：重复读取同一批文章（工作集小于缓存容量）
+        working_set = inputs[:1000]
+        optimized.cache_clear()
+        bench(optimized, working_set, 1)
+        cached_us = bench(optimized, working_set, args.iterations)
+        print(f"{name:<22}{reference_us:>14.2f}{compiled_us:>14.2f}{cached_us:>11.2f}{reference_us / compiled_us:>8.1f}x")
+
+    print("outputs identical to reference" if ok else "outputs differ from reference")
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
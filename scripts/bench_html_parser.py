@@ -0,0 +1,112 @@
+"""
+HTML 解析后端基准测试与一致性检查
+
+用法：
+    python scripts/bench_html_parser.py [--fixtures scripts/fixtures/html] [--iterations 20]
+
+fixtures 目录结构（仓库中已提交一份，见 scripts/fixtures/html）：
+    tldr/*.html       保存的 tldr.tech 页面，例如 curl -o tldr/2024-01-02.html https://tldr.tech/tech/2024-01-02
+    articles/*.html   保存的文章页面
+
+对每个可用后端（lxml / html.parser）测量解析耗时，并检查提取出的
+版块、标题、内容、链接和图片在所有后端之间完全一致；
+不一致、或者找不到 fixtures 时以非零状态码退出。
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.html_parser import available_parsers, make_soup
+from api.services.newsletter import _parse_tldr_sections
+from api.services.image_extractor import _find_page_image
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'html')
+
+def load_fixtures(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read().decode('utf-8', errors='replace')))
+    return pages
+
+def extract_tldr(html, parser):
+    return _parse_tldr_sections(html, parser)
+
+def extract_article(name, html, parser):
+    return _find_page_image(make_soup(html, parser), f"https://example.com/{name}")
+
+def describe_differences(expected, actual, path=''):
+    """逐个字段列出两份解析结果的差异，例如 [1].articles[0].title"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key in sorted(set(expected) | set(actual)):
+            differences += describe_differences(expected.get(key), actual.get(key), f"{path}.{key}")
+        return differences
+    if isinstance(expected, list) and isinstance(actual, list):
+        differences = []
+        if len(expected) != len(actual):
+            differences.append(f"{path or '.'}: {len(expected)} items vs {len(actual)}")
+        for i, (left, right) in enumerate(zip(expected, actual)):
+            differences += describe_differences(left, right, f"{path}[{i}]")
+        return differences
+    if expected != actual:
+        return [f"{path or '.'}: {expected!r} != {actual!r}"]
+    return []
+
+def bench(label, pages, extract, parsers, iterations):
+    if not pages:
+        # 没有 fixtures 就无法证明各后端结果一致，视为失败
+        print(f"[{label}] no fixtures found, cannot compare parsers")
+        return False
+
+    results = {}
+    timings = {}
+    for parser in parsers:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            output = [extract(name, html, parser) for name, html in pages]
+        timings[parser] = (time.perf_counter() - started) / iterations
+        results[parser] = output
+
+    baseline = timings.get('html.parser')
+    print(f"[{label}] {len(pages)} pages, {iterations} iterations")
+    for parser in parsers:
+        speedup = f", {baseline / timings[parser]:.1f}x vs html.parser" if baseline else ""
+        print(f"  {parser:<12} {timings[parser] * 1000:8.2f} ms/pass{speedup}")
+
+    consistent = True
+    reference = results[parsers[-1]]
+    for parser in parsers[:-1]:
+        for (name, _), expected, actual in zip(pages, reference, results[parser]):
+            if expected != actual:
+                consistent = False
+                print(f"  MISMATCH {parser} vs {parsers[-1]} on {name}")
+                for difference in describe_differences(expected, actual)[:10]:
+                    print(f"    {difference}")
+    if consistent:
+        print("  outputs identical across parsers")
+    return consistent
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    parsers = available_parsers()
+    print(f"Available parsers: {', '.join(parsers)}")
+
+    tldr_pages = load_fixtures(os.path.join(args.fixtures, 'tldr'))
+    article_pages = load_fixtures(os.path.join(args.fixtures, 'articles'))
+
+    ok = bench('tldr.tech', tldr_pages, lambda name, html, p: extract_tldr(html, p), parsers, args.iterations)
+    ok = bench('articles', article_pages, extract_article, parsers, args.iterations) and ok
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+读接口查询方式基准测试：完整 Document vs 投影 + 原始字典（api/services/repository.py）
+
+用法：
+    python scripts/bench_reads.py [--issues 200] [--articles 30] [--subscribers 5000] [--iterations 50]
+    python scripts/bench_reads.py --mongo-uri mongodb://localhost:27017/bench_reads
+
+默认使用 mongomock（pip install -r requirements-dev.txt）并写入合成数据（--mongo-uri 指向的数据库会被清空，不要指向线上库）。
+对每个读操作分别测量两种写法的平均耗时和每次调用分配的内存（tracemalloc）。
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def seed(issues, articles, subscribers):
+    from api.models.article import DailyNewsletter
+    from api.models.subscriber import Subscriber
+
+    DailyNewsletter.objects.delete()
+    Subscriber.objects.delete()
+
+    section_names = ['Big Tech & Startups', 'Science & Futuristic Technology',
+                     'Programming, Design & Data Science', 'Miscellaneous', 'Quick Links']
+    start = date(2024, 1, 1)
+    DailyNewsletter.objects.insert([
+        DailyNewsletter(
+            date=start + timedelta(days=i),
+            generated_title=f"第 {i} 期标题",
+            status='complete',
+            sections=[
+                {
+                    'section': name,
+                    'articles': [
+                        {
+                            'title': f"标题 {i}-{s}-{a}（阅读时长3分钟）",
+                            'title_en': f"Title {i}-{s}-{a} (3 minute read)",
+                            'content': "中文摘要" * 40,
+                            'content_en': "English summary " * 30,
+                            'url': f"https://example.com/{i}/{s}/{a}",
+                            'image_url': f"https://example.com/{i}/{s}/{a}.png"
+                        }
+                        for a in range(articles // len(section_names))
+                    ]
+                }
+                for s, name in enumerate(section_names)
+            ]
+        )
+        for i in range(issues)
+    ])
+    Subscriber.objects.insert([
+        Subscriber(email=f"reader{i}@example.com", confirmation_token=f"token-{i}", confirmed=True)
+        for i in range(subscribers)
+    ])
+    return (start + timedelta(days=issues // 2)).strftime('%Y-%m-%d')
+
+def measure(func, iterations):
+    """返回 (平均毫秒, 每次调用分配的 KB)"""
+    func()  # 预热
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = (time.perf_counter() - started) / iterations
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+    return elapsed * 1000, allocated / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Document vs projected raw reads")
+    parser.add_argument('--issues', type=int, default=200)
+    parser.add_argument('--articles', type=int, default=30, help='articles per issue')
+    parser.add_argument('--subscribers', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--mongo-uri', default='mongomock://localhost/bench_reads')
+    args = parser.parse_args()
+
+    os.environ['MONGODB_URI'] = args.mongo_uri
+    from api import create_app
+    from api.models.article import DailyNewsletter
+    from api.models.subscriber import Subscriber
+    from api.services import repository
+
+    app = create_app()
+    with app.app_context():
+        middle = seed(args.issues, args.articles, args.subscribers)
+        latest = repository.get_latest_issue_date()
+
+        cases = [
+            (
+                'issue by date',
+                lambda: DailyNewsletter.objects(date=middle).first().sections,
+                lambda: repository.get_issue(middle).sections
+            ),
+            (
+                'latest issue date',
+                lambda: DailyNewsletter.objects().order_by('-date').first().date.strftime('%Y-%m-%d'),
+                lambda: repository.get_latest_issue_date()
+            ),
+            (
+                'featured (3 recent)',
+                lambda: [n.sections for n in DailyNewsletter.objects.order_by('-date').limit(3)],
+                lambda: [n.sections for n in repository.get_issues_before(latest, 3)]
+            ),
+            (
+                'sitemap dates',
+                lambda: [n.date.strftime('%Y-%m-%d') for n in DailyNewsletter.objects().order_by('-date').only('date')],
+                lambda: list(repository.iter_issue_dates())
+            ),
+            (
+                'recipients + ids',
+                # 原写法：先取全部订阅者，再逐个查询 id（N+1）
+                lambda: {
+                    s.email: str(Subscriber.objects(email=s.email).first().id)
+                    for s in Subscriber.objects(confirmed=True).all()[:200]
+                },
+                lambda: dict(list(repository.get_confirmed_recipients().items())[:200])
+            )
+        ]
+
+        print(f"{args.issues} issues x {args.articles} articles, {args.subscribers} subscribers, "
+              f"{args.iterations} iterations ({args.mongo_uri.split(':')[0]})")
+        print(f"{'operation':<22}{'document ms':>13}{'raw ms':>10}{'speedup':>9}{'document KB':>13}{'raw KB':>10}")
+        for name, document_read, raw_read in cases:
+            iterations = max(1, args.iterations // 10) if name == 'recipients + ids' else args.iterations
+            doc_ms, doc_kb = measure(document_read, iterations)
+            raw_ms, raw_kb = measure(raw_read, iterations)
+            print(f"{name:<22}{doc_ms:>13.2f}{raw_ms:>10.2f}{doc_ms / raw_ms:>8.1f}x{doc_kb:>13.0f}{raw_kb:>10.0f}")
+
+if __name__ == '__main__':
+    main()
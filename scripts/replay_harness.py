@@ -0,0 +1,467 @@
+"""
+离线录制 / 回放基准测试
+
+用法：
+    # 录制：真实抓取 tldr.tech 页面及其中所有文章页面，保存到 fixtures（只需联网一次）
+    python scripts/replay_harness.py record --date 2024-06-03 --date 2024-06-04
+
+    # 基准测试：启动本地替身服务器，完全离线地运行采集（和可选的邮件发送）流程
+    python scripts/replay_harness.py bench --runs 3 --llm-latency 1.5 --subscribers 500
+
+    # 只启动替身服务器，配合下面打印出的环境变量手动运行 run.py / worker.py 压测
+    python scripts/replay_harness.py serve --port 8900
+
+替身服务器（同一个端口，按请求区分）：
+    POST /v1/chat/completions   OpenAI 兼容的假 DeepSeek 接口：批量请求返回同长度的 JSON 数组，
+                                可配置延迟、抖动和 429 比例（带 Retry-After）
+    Host: api.mailgun.net       假 Mailgun，直接返回 Queued
+    其他 GET                    按 Host + 路径回放录制的页面，支持 ETag / If-None-Match
+
+应用通过 HTTP_HOST_OVERRIDES 和 DEEPSEEK_BASE_URL 指向替身服务器，代码路径与线上一致。
+bench 默认使用 mongomock（pip install -r requirements-dev.txt；--mongo-uri 可改为本地数据库），每轮开始前清空简报、缓存和租约，
+--warm 则保留上一轮的结果，用于测量条件请求和缓存命中时的耗时。
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'replay')
+# 单个页面最多保存的字节数（图片提取只读取 <head>）
+MAX_BODY_BYTES = 2 * 1024 * 1024
+REPLAY_TITLE = "重磅！离线回放基准测试 | 替身接口生成的标题"
+
+logger = logging.getLogger(__name__)
+
+def fixture_key(url):
+    """录制和回放共用的页面 key：主机 + 路径 + 查询参数"""
+    parts = urlsplit(url)
+    key = parts.netloc.lower() + (parts.path or '/')
+    if parts.query:
+        key += '?' + parts.query
+    return key
+
+class Fixtures:
+    """录制的页面：manifest.json 记录元数据，页面内容按哈希保存在 bodies/ 下"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.manifest = {'dates': [], 'entries': {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def dates(self):
+        return sorted(self.manifest['dates'])
+
+    def add(self, url, response):
+        body = response.content[:MAX_BODY_BYTES]
+        digest = hashlib.sha1(body).hexdigest()
+        path = os.path.join(self.directory, 'bodies', digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+
+        with self._lock:
+            self.manifest['entries'][fixture_key(url)] = {
+                'url': url,
+                'status': response.status_code,
+                'content_type': response.headers.get('Content-Type', 'text/html; charset=utf-8'),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'body': digest
+            }
+
+    def add_date(self, date):
+        with self._lock:
+            if date not in self.manifest['dates']:
+                self.manifest['dates'].append(date)
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def lookup(self, key):
+        return self.manifest['entries'].get(key)
+
+    def body(self, entry):
+        digest = entry['body']
+        body = self._bodies.get(digest)
+        if body is None:
+            with open(os.path.join(self.directory, 'bodies', digest), 'rb') as f:
+                body = f.read()
+            self._bodies[digest] = body
+        return body
+
+class Stats:
+    """替身服务器的调用计数（线程安全）"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+def fake_completion(system, user, stats):
+    """按提示词类型生成确定性的假回复"""
+    from api.services.translator import BATCH_FORMAT_RULES, TITLE_SYSTEM_PROMPT, CONTENT_SYSTEM_PROMPT
+
+    if system.endswith(BATCH_FORMAT_RULES):
+        items = json.loads(user)
+        stats.incr('llm_items', len(items))
+        return json.dumps([f"【译】{item}" for item in items], ensure_ascii=False)
+    if system in (TITLE_SYSTEM_PROMPT, CONTENT_SYSTEM_PROMPT):
+        stats.incr('llm_items')
+        return f"【译】{user.split(chr(10) * 2, 1)[-1]}"
+    # 其余请求视为标题生成
+    stats.incr('llm_titles')
+    return REPLAY_TITLE
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def host(self):
+        return (self.headers.get('Host') or '').lower()
+
+    def do_GET(self):
+        fixtures, stats = self.server.fixtures, self.server.stats
+        entry = fixtures.lookup(self.host + self.path)
+        if entry is None:
+            stats.incr('pages_missing')
+            return self._send(404, b'not recorded', 'text/plain')
+
+        headers = {}
+        if entry.get('etag'):
+            headers['ETag'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['Last-Modified'] = entry['last_modified']
+        if entry.get('etag') and self.headers.get('If-None-Match') == entry['etag']:
+            stats.incr('pages_not_modified')
+            return self._send(304, b'', None, headers)
+
+        stats.incr('tldr_pages' if self.host.startswith('tldr.tech') else 'article_pages')
+        self._send(entry['status'], fixtures.body(entry), entry['content_type'], headers)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path.rstrip('/').endswith('/chat/completions'):
+            return self._chat(body)
+        if self.host.startswith('api.mailgun.net'):
+            return self._mailgun(body)
+        self._send(404, b'{}', 'application/json')
+
+    def _chat(self, body):
+        options, stats = self.server.options, self.server.stats
+        payload = json.loads(body)
+        messages = payload.get('messages', [])
+        system = next((m['content'] for m in messages if m['role'] == 'system'), '')
+        user = messages[-1]['content'] if messages else ''
+        stats.incr('llm_requests')
+
+        delay = options['latency'] + random.uniform(0, options['jitter'])
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < options['error_rate']:
+            stats.incr('llm_rate_limited')
+            error = {'error': {'message': 'Rate limit reached (replay)', 'type': 'rate_limit_error'}}
+            return self._send(429, json.dumps(error).encode(), 'application/json', {'Retry-After': '1'})
+
+        content = fake_completion(system, user, stats)
+        prompt_tokens = sum(len(m.get('content') or '') for m in messages) // 2
+        completion_tokens = len(content) // 2
+        response = {
+            'id': f"replay-{stats.snapshot().get('llm_requests', 0)}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }
+        self._send(200, json.dumps(response, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def _mailgun(self, body):
+        stats = self.server.stats
+        form = parse_qs(body.decode('utf-8', errors='replace'))
+        stats.incr('mailgun_messages')
+        stats.incr('mailgun_recipients', len(form.get('to', [])))
+        response = {'id': f"<replay.{time.time_ns()}@mailgun>", 'message': 'Queued. Thank you.'}
+        self._send(200, json.dumps(response).encode(), 'application/json')
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+def start_server(fixtures, port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+    """在后台线程中启动替身服务器，返回 server（server.server_address 为实际地址）"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StandInHandler)
+    server.daemon_threads = True
+    server.fixtures = fixtures
+    server.stats = Stats()
+    server.options = {'latency': latency, 'jitter': jitter, 'error_rate': error_rate}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def point_app_at(server):
+    """通过环境变量把出站请求指向替身服务器（必须在导入 api 之前调用）"""
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ['HTTP_HOST_OVERRIDES'] = f"*={base_url}"
+    os.environ['DEEPSEEK_BASE_URL'] = f"{base_url}/v1"
+    return base_url
+
+########################
+# record               #
+########################
+
+def record(args):
+    from api.services import http_client
+    from api.services.newsletter import _parse_tldr_sections
+
+    fixtures = Fixtures(args.fixtures)
+
+    def fetch(url):
+        try:
+            return url, http_client.get(url)
+        except Exception as e:
+            logger.warning(f"Failed to record {url}: {str(e)}")
+            return url, None
+
+    for date in args.date:
+        url = f"https://tldr.tech/tech/{date}"
+        _, response = fetch(url)
+        if response is None:
+            continue
+        fixtures.add(url, response)
+        if response.status_code != 200:
+            logger.warning(f"{url} returned HTTP {response.status_code}, recorded as is")
+            continue
+
+        article_urls = sorted({
+            article['url']
+            for section in _parse_tldr_sections(response.text)
+            for article in section['articles']
+            if article['url']
+        })
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for article_url, article_response in executor.map(fetch, article_urls):
+                if article_response is not None:
+                    fixtures.add(article_url, article_response)
+
+        fixtures.add_date(date)
+        fixtures.save()
+        logger.info(f"Recorded {date}: 1 issue page, {len(article_urls)} article pages")
+
+########################
+# serve                #
+########################
+
+def serve(args):
+    fixtures = Fixtures(args.fixtures)
+    server = start_server(fixtures, args.port, args.llm_latency, args.llm_jitter, args.llm_error_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Stand-in servers listening on {base_url} ({len(fixtures.manifest['entries'])} recorded pages)")
+    print("Point the app at them with:")
+    print(f"  export HTTP_HOST_OVERRIDES='*={base_url}'")
+    print(f"  export DEEPSEEK_BASE_URL='{base_url}/v1'")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"calls so far: {format_counts(server.stats.snapshot())}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+########################
+# bench                #
+########################
+
+def format_counts(counts):
+    return ' '.join(f"{name}={value}" for name, value in sorted(counts.items())) or '(none)'
+
+def reset_state():
+    """清空上一轮的简报、断点、缓存和租约"""
+    from api.models.article import DailyNewsletter, NewsletterStaging
+    from api.models.image_cache import CachedImage
+    from api.models.ingest_job import IngestJob
+    from api.models.lease import GenerationLease
+    from api.models.source_page import SourcePage
+    from api.models.translation_cache import CachedTranslation
+    from api.services.translation_cache import translation_cache
+
+    for model in (DailyNewsletter, NewsletterStaging, CachedImage, IngestJob,
+                  GenerationLease, SourcePage, CachedTranslation):
+        model.objects.delete()
+    translation_cache.clear()
+
+def seed_subscribers(count):
+    from api.models.subscriber import Subscriber
+
+    Subscriber.objects(email__endswith='@replay.example.com').delete()
+    if count:
+        Subscriber.objects.insert([
+            Subscriber(email=f"reader{i}@replay.example.com", confirmation_token=f"replay-{i}", confirmed=True)
+            for i in range(count)
+        ])
+    return [f"reader{i}@replay.example.com" for i in range(count)]
+
+def send_email(emails):
+    from flask import current_app
+    from api.models.article import DailyNewsletter
+    from api.services.mailgun_service import MailgunService
+
+    newsletter = DailyNewsletter.complete.order_by('-date').first()
+    if not newsletter:
+        return None
+    mailgun = MailgunService(current_app.config['MAILGUN_API_KEY'], current_app.config['MAILGUN_DOMAIN'])
+    started = time.perf_counter()
+    html_content = mailgun.generate_newsletter_html(newsletter)
+    mailgun.send_daily_newsletter(emails, f"[{newsletter.generated_title}] {newsletter.date}", html_content)
+    return time.perf_counter() - started
+
+def bench(args):
+    fixtures = Fixtures(args.fixtures)
+    dates = args.date or fixtures.dates
+    if not dates:
+        print(f"No recorded dates in {args.fixtures}, run the record command first")
+        sys.exit(1)
+
+    server = start_server(fixtures, 0, args.llm_latency, args.llm_jitter, args.llm_error_rate)
+    point_app_at(server)
+    # 其余配置在导入 api 之前设置，保证不会误连线上服务
+    os.environ['MONGODB_URI'] = args.mongo_uri
+    os.environ['DEEPSEEK_API_KEY'] = 'replay'
+    os.environ['MAILGUN_API_KEY'] = 'replay'
+    os.environ['MAILGUN_DOMAIN'] = 'replay.example.com'
+    os.environ.setdefault('BACKEND_URL', 'http://127.0.0.1:5000')
+
+    from api import create_app
+    from api.services import llm_limiter
+    from api.services.newsletter import IngestError, generate_newsletter
+    from api.services.translation_cache import translation_cache
+
+    app = create_app()
+    if args.llm_concurrency:
+        llm_limiter.set_max_concurrency(args.llm_concurrency)
+
+    def ingest(date):
+        with app.app_context():
+            started = time.perf_counter()
+            try:
+                result = generate_newsletter(date)
+            except IngestError as e:
+                logger.error(f"Ingest failed for {date}: {str(e)}")
+                result = None
+            articles = sum(len(s['articles']) for s in result['sections']) if result else 0
+            return date, time.perf_counter() - started, articles
+
+    with app.app_context():
+        emails = seed_subscribers(args.subscribers)
+
+        for run in range(1, args.runs + 1):
+            warm = args.warm and run > 1
+            if not warm:
+                reset_state()
+            server.stats.reset()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.date_workers) as executor:
+                results = list(executor.map(ingest, dates))
+            elapsed = time.perf_counter() - started
+
+            email_seconds = send_email(emails) if emails else None
+
+            total_articles = sum(articles for _, _, articles in results)
+            print(f"\nRun {run} ({'warm' if warm else 'cold'}): {len(dates)} dates, {total_articles} articles "
+                  f"in {elapsed:.2f}s | {len(dates) / elapsed:.2f} dates/s, {total_articles / elapsed:.2f} articles/s")
+            for date, seconds, articles in results:
+                print(f"  {date}: {seconds:7.2f}s  {articles} articles")
+            if email_seconds is not None:
+                print(f"  email: {len(emails)} recipients in {email_seconds:.2f}s")
+            print(f"  calls: {format_counts(server.stats.snapshot())}")
+
+            limiter = llm_limiter.metrics()
+            cache = translation_cache.stats()
+            print(f"  llm: concurrency_limit={limiter['concurrency_limit']} retries={limiter['retries']} "
+                  f"rate_limited={limiter['rate_limited']} | translation cache hit_rate={cache['hit_rate']}")
+
+    server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay ingestion traffic for offline benchmarks")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--verbose', action='store_true', help='show application INFO logs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='fetch and save real pages for the given dates')
+    record_parser.add_argument('--date', action='append', required=True, help='YYYY-MM-DD, repeatable')
+    record_parser.add_argument('--workers', type=int, default=8)
+
+    for name in ('serve', 'bench'):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--llm-latency', type=float, default=0.5, help='seconds per fake LLM call')
+        sub.add_argument('--llm-jitter', type=float, default=0.0, help='extra random latency, 0..N seconds')
+        sub.add_argument('--llm-error-rate', type=float, default=0.0, help='fraction of LLM calls answered with 429')
+    subparsers.choices['serve'].add_argument('--port', type=int, default=8900)
+
+    bench_parser = subparsers.choices['bench']
+    bench_parser.add_argument('--date', action='append', help='recorded dates to ingest (default: all)')
+    bench_parser.add_argument('--runs', type=int, default=1)
+    bench_parser.add_argument('--warm', action='store_true', help='keep results and caches between runs')
+    bench_parser.add_argument('--date-workers', type=int, default=1, help='dates ingested concurrently')
+    bench_parser.add_argument('--llm-concurrency', type=int, default=0, help='max concurrent LLM calls (0 = default)')
+    bench_parser.add_argument('--subscribers', type=int, default=0, help='also send the latest issue to N fake subscribers')
+    bench_parser.add_argument('--mongo-uri', default='mongomock://localhost/replay')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    {'record': record, 'serve': serve, 'bench': bench}[args.command](args)
+
+if __name__ == '__main__':
+    main()
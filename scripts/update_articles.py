@@ -7,6 +7,7 @@ from api import create_app
 from api.models.article import DailyNewsletter
 from api.services.image_extractor import extract_article_image
 import logging
+from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,6 +35,7 @@ def update_articles_with_images():
                                 logger.info(f"Added image URL: {image_url}")
             
             if modified:
+                newsletter.updated_at = datetime.utcnow()
                 newsletter.save()
                 logger.info(f"Updated newsletter for date: {newsletter.date}")
 
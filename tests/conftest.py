@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# 测试只使用内存中的 mongomock，不连接真实数据库
+os.environ['MONGODB_URI'] = 'mongomock://localhost/tldr_test'
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def app():
+    from api import create_app
+    return create_app()
+
+@pytest.fixture
+def db(app):
+    """每个测试开始时清空所有集合（保留索引），在应用上下文中运行"""
+    from mongoengine.connection import get_db
+    with app.app_context():
+        database = get_db()
+        for name in database.list_collection_names():
+            database[name].delete_many({})
+        yield database
@@ -0,0 +1,104 @@
+import gzip
+from datetime import datetime
+import pytest
+from flask import Response
+from api.models.article import DailyNewsletter
+from api.services.compression import (
+    HAS_BROTLI,
+    available_encodings,
+    compress_response,
+    if_none_match_etag,
+    negotiate_encoding,
+    representation_etag
+)
+from api.services.latest_issue import advance_latest_issue, clear_latest_cache
+from api.services.response_cache import newsletter_cache, sitemap_cache
+
+ARTICLES = [
+    {'title': f'第 {i} 篇文章', 'content': '这是一段足够长的正文，用来让响应超过压缩阈值。' * 5, 'url': f'https://example.com/{i}'}
+    for i in range(20)
+]
+
+@pytest.fixture
+def client(app, db):
+    newsletter_cache.clear()
+    sitemap_cache.clear()
+    clear_latest_cache()
+    DailyNewsletter(
+        date=datetime(2024, 6, 3),
+        sections=[{'section': 'Big Tech & Startups', 'articles': ARTICLES}],
+        generated_title='往期',
+        updated_at=datetime.utcnow()
+    ).save()
+    advance_latest_issue('2024-06-03')
+    yield app.test_client()
+    newsletter_cache.clear()
+    sitemap_cache.clear()
+    clear_latest_cache()
+
+def test_negotiate_encoding_follows_quality(app):
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip;q=0.5, br;q=1'}):
+        assert negotiate_encoding(['gzip']) == 'gzip'
+        assert negotiate_encoding(['br', 'gzip']) == 'br'
+    with app.test_request_context(headers={'Accept-Encoding': 'identity'}):
+        assert negotiate_encoding(['gzip']) is None
+
+def test_if_none_match_accepts_every_representation(app):
+    etag = 'abc'
+    for encoding in [None] + available_encodings():
+        candidate = representation_etag(etag, encoding)
+        with app.test_request_context(headers={'If-None-Match': f'"{candidate}"'}):
+            assert if_none_match_etag(etag) == candidate
+    with app.test_request_context(headers={'If-None-Match': '"abc-deflate"'}):
+        assert if_none_match_etag(etag) is None
+
+def test_cached_newsletter_sends_precompressed_gzip(client):
+    plain = client.get('/api/newsletter/2024-06-03', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    resp = client.get('/api/newsletter/2024-06-03', headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    etag = plain.headers['ETag'].strip('"')
+    assert resp.headers['ETag'] == f'"{representation_etag(etag, "gzip")}"'
+    assert gzip.decompress(resp.data) == plain.data
+
+def test_suffixed_etag_answers_304(client):
+    etag = client.get('/api/newsletter/2024-06-03', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert etag.endswith('-gzip"')
+    resp = client.get('/api/newsletter/2024-06-03', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert resp.status_code == 304
+
+@pytest.mark.skipif(not HAS_BROTLI, reason='brotli is not installed')
+def test_cached_newsletter_prefers_brotli(client):
+    resp = client.get('/api/newsletter/2024-06-03', headers={'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'br'
+    assert resp.headers['ETag'].endswith('-br"')
+
+def test_sitemap_matches_suffixed_etag_on_cache_miss(client):
+    resp = client.get('/api/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200
+    etag = resp.headers['ETag']
+
+    # 缓存被清空（例如进程重启）后，带编码后缀的 ETag 仍然命中
+    sitemap_cache.clear()
+    resp = client.get('/api/sitemap.xml', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert 'Accept-Encoding' in resp.headers['Vary']
+
+def test_dynamic_compression_of_large_text_responses(app):
+    body = b'{"items":[' + b'"tldr",' * 500 + b'"end"]}'
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        resp = Response(body, mimetype='application/json')
+        resp.set_etag('dynamic')
+        resp = compress_response(resp)
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert resp.get_etag() == ('dynamic-gzip', False)
+        assert gzip.decompress(resp.get_data()) == body
+
+def test_dynamic_compression_skips_small_and_binary_responses(app):
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        small = compress_response(Response(b'{}', mimetype='application/json'))
+        assert 'Content-Encoding' not in small.headers
+        image = compress_response(Response(b'\x89PNG' * 1000, mimetype='image/png'))
+        assert 'Content-Encoding' not in image.headers
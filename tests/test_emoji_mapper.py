@@ -0,0 +1,16 @@
+from api.services.emoji_mapper import article_display_fields, display_title, display_title_en
+
+ARTICLE = {
+    'title': '英伟达发布新一代 AI 芯片（4 分钟阅读）',
+    'title_en': 'Nvidia reveals its next-gen AI chips (4 minute read)'
+}
+
+def test_display_fields_match_read_time_rendering():
+    fields = article_display_fields(ARTICLE)
+    assert set(fields) == {'title_en_clean', 'title_emoji'}
+    assert fields['title_en_clean'] == 'Nvidia reveals its next-gen AI chips'
+
+    stored = {**ARTICLE, **fields}
+    assert display_title(stored) == display_title(ARTICLE)
+    assert display_title_en(stored) == display_title_en(ARTICLE)
+    assert '分钟' not in display_title(ARTICLE)
@@ -0,0 +1,66 @@
+"""
+lxml 与 html.parser 对同一份 tldr.tech 页面（scripts/fixtures/html）的解析结果必须一致，
+make_soup 默认使用 lxml 依赖于这一点
+"""
+import os
+import pytest
+from api.services.html_parser import HAS_LXML, PORTABLE_PARSER, available_parsers, make_soup
+from api.services.image_extractor import _find_page_image
+from api.services.newsletter import _parse_tldr_sections
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'fixtures', 'html')
+
+def read_fixture(*parts):
+    with open(os.path.join(FIXTURES, *parts), encoding='utf-8') as f:
+        return f.read()
+
+@pytest.fixture(scope='module')
+def tldr_page():
+    return read_fixture('tldr', '2024-06-04.html')
+
+@pytest.mark.parametrize('parser', available_parsers())
+def test_parse_tldr_sections(tldr_page, parser):
+    sections = _parse_tldr_sections(tldr_page, parser)
+
+    # 赞助版块和赞助文章被跳过
+    assert [section['section'] for section in sections] == [
+        'Big Tech & Startups',
+        'Science & Futuristic Technology',
+        'Programming, Design & Data Science',
+        'Miscellaneous',
+        'Quick Links'
+    ]
+    assert [len(section['articles']) for section in sections] == [2, 2, 2, 2, 2]
+
+    first = sections[0]['articles'][0]
+    assert first['title'] == 'Nvidia reveals its next-gen AI chips at Computex (4 minute read)'
+    assert first['url'] == 'https://www.theverge.com/2024/6/3/nvidia-computex-roadmap?utm_source=tldrnewsletter'
+    assert first['content'].startswith('Nvidia CEO Jensen Huang announced the company’s next platform')
+
+    # 正文中的链接文字被移除，实体被解码
+    second = sections[0]['articles'][1]
+    assert second['title'] == "What to expect from Apple's WWDC 2024 (6 minute read)"
+    assert 'More coverage' not in second['content']
+    assert 'iOS\xa018' in second['content']
+
+    # 没有链接的文章 url 为空
+    assert sections[3]['articles'][1] == {
+        'title': 'An article without a link',
+        'content': 'Some items are published without a source link.',
+        'url': ''
+    }
+    assert sections[4]['articles'][1]['title'] == '腾讯发布混元大模型开源版本 (1 minute read)'
+
+@pytest.mark.skipif(not HAS_LXML, reason='lxml is not installed')
+def test_lxml_matches_html_parser(tldr_page):
+    assert _parse_tldr_sections(tldr_page, 'lxml') == _parse_tldr_sections(tldr_page, PORTABLE_PARSER)
+
+@pytest.mark.parametrize('parser', available_parsers())
+@pytest.mark.parametrize('page, expected', [
+    ('og-image.html', 'https://cdn.example.com/uploads/2024/06/nvidia-computex.jpg?w=1200&h=630'),
+    ('article-img.html', 'https://blog.example.dev/posts/images/sqlite-wal.png'),
+    ('keyword-img.html', 'https://media.wired.com/photos/robotaxi/hero-image.jpg')
+])
+def test_find_page_image(parser, page, expected):
+    soup = make_soup(read_fixture('articles', page), parser)
+    assert _find_page_image(soup, 'https://blog.example.dev/posts/sqlite') == expected
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+import pytest
+from api.models.image_cache import CachedImage
+from api.services import image_extractor
+from api.services.image_extractor import _find_meta_image, _make_soup, extract_article_image
+
+PAGE = '<html><head><meta property="og:image" content="https://example.com/图片.png"></head><body></body></html>'
+
+def test_make_soup_with_declared_charset():
+    soup = _make_soup(PAGE.encode('utf-8'), 'utf-8')
+    assert _find_meta_image(soup) == 'https://example.com/图片.png'
+
+def test_make_soup_with_unknown_charset():
+    # Content-Type 中声明了不存在的编码时不应抛出 LookupError
+    soup = _make_soup(PAGE.encode('utf-8'), 'x-bogus-charset')
+    assert _find_meta_image(soup) == 'https://example.com/图片.png'
+
+def test_make_soup_without_charset():
+    soup = _make_soup(PAGE.encode('utf-8'), None)
+    assert _find_meta_image(soup) == 'https://example.com/图片.png'
+
+@pytest.mark.parametrize('status, image_url, ttl', [
+    ('found', 'https://example.com/a.png', image_extractor.IMAGE_CACHE_TTL),
+    ('none', None, image_extractor.IMAGE_CACHE_NEGATIVE_TTL),
+    ('error', None, image_extractor.IMAGE_CACHE_ERROR_TTL)
+])
+def test_cache_ttl_by_status(db, monkeypatch, status, image_url, ttl):
+    monkeypatch.setattr(image_extractor, '_extract_article_image_uncached', lambda url: (image_url, status))
+    assert extract_article_image('https://example.com/article') == image_url
+
+    expires_in = CachedImage.objects(url='https://example.com/article').first().expires_at - datetime.utcnow()
+    assert ttl - timedelta(minutes=1) < expires_in <= ttl
@@ -0,0 +1,99 @@
+import pytest
+from api.models.article import NewsletterStaging
+from api.services import newsletter
+from api.services.ingest_checkpoint import IngestCheckpoint
+
+DATE = '2024-06-04'
+
+FIRST = {'title': 'First (2 minute read)', 'content': 'First article.', 'url': 'https://example.com/1'}
+SECOND = {'title': 'Second (3 minute read)', 'content': 'Second article.', 'url': ''}
+
+class FakeTranslator:
+    """翻译结果加上 [zh] 前缀；fail 中的原文按翻译失败处理（原样返回）"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.titles = []
+
+    def translate_titles(self, titles):
+        self.titles.extend(titles)
+        return [self._translate(title) for title in titles]
+
+    def translate_contents(self, contents):
+        return [self._translate(content) for content in contents]
+
+    def is_translated(self, source, result):
+        return result != source
+
+    def _translate(self, text):
+        return text if text in self.fail else f"[zh] {text}"
+
+@pytest.fixture(autouse=True)
+def no_images(db, monkeypatch):
+    monkeypatch.setattr(newsletter, 'extract_article_image', lambda url: f"{url}/image.png")
+
+def test_progress_survives_a_new_checkpoint():
+    checkpoint = IngestCheckpoint(DATE)
+    checkpoint.save_translation(FIRST, '第一篇', '第一篇内容')
+    checkpoint.save_image(FIRST, 'https://example.com/1.png')
+
+    resumed = IngestCheckpoint(DATE)
+    assert resumed.has_translation(FIRST)
+    assert resumed.has_image(FIRST)
+    assert resumed.get(FIRST) == {
+        'translation': 'done',
+        'title': '第一篇',
+        'content': '第一篇内容',
+        'image': 'done',
+        'image_url': 'https://example.com/1.png'
+    }
+    assert not resumed.has_translation(SECOND)
+
+def test_changed_article_is_not_resumed():
+    IngestCheckpoint(DATE).save_translation(FIRST, '第一篇', '第一篇内容')
+    assert not IngestCheckpoint(DATE).has_translation(dict(FIRST, content='Updated article.'))
+
+def test_discard_removes_staged_progress():
+    checkpoint = IngestCheckpoint(DATE)
+    checkpoint.save_translation(FIRST, '第一篇', '第一篇内容')
+    checkpoint.discard()
+    assert NewsletterStaging.objects(date=DATE).count() == 0
+    assert not IngestCheckpoint(DATE).has_translation(FIRST)
+
+def test_seed_from_sections_reuses_stored_articles_in_memory():
+    checkpoint = IngestCheckpoint(DATE)
+    checkpoint.seed_from_sections([{
+        'section': 'Big Tech & Startups',
+        'articles': [{
+            'title': '第一篇',
+            'title_en': FIRST['title'],
+            'content': '第一篇内容',
+            'content_en': FIRST['content'],
+            'url': FIRST['url'],
+            'image_url': None
+        }]
+    }])
+    assert checkpoint.has_translation(FIRST)
+    assert checkpoint.has_image(FIRST)
+    assert checkpoint.get(FIRST)['title'] == '第一篇'
+    # 只预填内存，不写入暂存集合
+    assert NewsletterStaging.objects(date=DATE).count() == 0
+
+def test_resumed_ingest_only_translates_unfinished_articles():
+    sections = [{'section': 'Big Tech & Startups', 'articles': [FIRST, SECOND]}]
+
+    # 第一次采集时第二篇翻译失败
+    translator = FakeTranslator(fail=[SECOND['title']])
+    newsletter._process_articles_concurrently(sections, translator, 2, IngestCheckpoint(DATE))
+    checkpoint = IngestCheckpoint(DATE)
+    assert checkpoint.has_translation(FIRST)
+    assert not checkpoint.has_translation(SECOND)
+
+    translator = FakeTranslator()
+    articles = newsletter._process_articles_concurrently(sections, translator, 2, checkpoint)
+    assert translator.titles == [SECOND['title']]
+    assert [article['title'] for article in articles[0]['articles']] == [
+        f"[zh] {FIRST['title']}",
+        f"[zh] {SECOND['title']}"
+    ]
+    assert articles[0]['articles'][0]['image_url'] == 'https://example.com/1/image.png'
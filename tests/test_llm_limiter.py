@@ -0,0 +1,95 @@
+import threading
+import time
+from api.services.llm_limiter import AdaptiveLimiter
+
+def make_limiter(**kwargs):
+    options = dict(max_concurrency=16, initial_concurrency=4, rpm=0, tpm=0, decrease_interval=5)
+    options.update(kwargs)
+    return AdaptiveLimiter(**options)
+
+def finish(limiter, latency=1.0, error=None, retry_after=None):
+    limiter.acquire(10)
+    limiter.release(latency, 10, 10, error=error, retry_after=retry_after)
+
+def test_success_increases_limit_additively():
+    limiter = make_limiter()
+    for _ in range(4):
+        finish(limiter)
+    # 每个成功请求 +1/limit，约 limit 个成功请求后并发 +1
+    assert 4.9 < limiter.limit < 5.0
+
+def test_slow_success_is_not_congestion():
+    limiter = make_limiter()
+    finish(limiter, latency=120.0)
+    assert limiter.limit > 4
+
+def test_limit_is_capped_at_max_concurrency():
+    limiter = make_limiter(max_concurrency=4)
+    for _ in range(10):
+        finish(limiter)
+    assert limiter.limit == 4
+
+def test_burst_of_errors_halves_once():
+    limiter = make_limiter(initial_concurrency=16)
+    for _ in range(16):
+        limiter.acquire(10)
+    for _ in range(16):
+        limiter.release(0.5, None, 10, error='rate_limited')
+    assert limiter.limit == 8
+    assert limiter.metrics()['rate_limited'] == 16
+
+def test_errors_after_interval_halve_again():
+    limiter = make_limiter(initial_concurrency=16, decrease_interval=0.05)
+    finish(limiter, error='server_errors')
+    assert limiter.limit == 8
+    time.sleep(0.06)
+    finish(limiter, error='timeouts')
+    assert limiter.limit == 4
+
+def test_decrease_interval_follows_latency():
+    limiter = make_limiter(initial_concurrency=16, decrease_interval=0.01)
+    finish(limiter, latency=60.0)
+    limit = limiter.limit
+    finish(limiter, error='timeouts')
+    time.sleep(0.02)
+    # 平均延迟 60s 内的失败属于同一批在途请求
+    finish(limiter, error='timeouts')
+    assert limiter.limit == limit / 2
+
+def test_other_errors_do_not_decrease():
+    limiter = make_limiter()
+    finish(limiter, error='other_errors')
+    assert limiter.limit == 4
+
+def test_limit_never_drops_below_one():
+    limiter = make_limiter(initial_concurrency=1, decrease_interval=0)
+    for _ in range(3):
+        finish(limiter, error='rate_limited')
+    assert limiter.limit == 1
+
+def test_retry_after_pauses_all_calls():
+    limiter = make_limiter()
+    finish(limiter, error='rate_limited', retry_after=0.3)
+    assert limiter.metrics()['paused_for_seconds'] > 0
+
+    started = time.monotonic()
+    limiter.acquire(10)
+    assert time.monotonic() - started >= 0.25
+    limiter.release(0.1, 10, 10)
+    assert limiter.metrics()['paused_for_seconds'] == 0
+
+def test_acquire_waits_for_free_slot():
+    limiter = make_limiter(initial_concurrency=1)
+    limiter.acquire(10)
+    acquired = threading.Event()
+
+    def second():
+        limiter.acquire(10)
+        acquired.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(0.1, 10, 10)
+    assert acquired.wait(2)
+    thread.join()
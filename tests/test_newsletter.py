@@ -0,0 +1,20 @@
+from datetime import datetime
+import pytest
+from api.models.article import DailyNewsletter
+from api.services.latest_issue import advance_latest_issue, clear_latest_cache
+from api.services.newsletter import get_newsletter
+
+@pytest.fixture
+def issues(db):
+    clear_latest_cache()
+    DailyNewsletter(date=datetime(2024, 6, 3), sections=[], generated_title='complete').save()
+    advance_latest_issue('2024-06-03')
+    DailyNewsletter(date=datetime(2024, 6, 4), sections=[], generated_title='partial', status='partial').save()
+    advance_latest_issue('2024-06-04', complete=False)
+    yield
+    clear_latest_cache()
+
+def test_future_date_falls_back_to_latest_complete_issue(issues):
+    newsletter = get_newsletter('2099-01-01')
+    assert newsletter['generated_title'] == 'complete'
+    assert newsletter['status'] == 'complete'
@@ -0,0 +1,26 @@
+from datetime import datetime
+import pytest
+from api.models.article import DailyNewsletter
+from api.services.repository import get_issues_before
+
+@pytest.fixture
+def issues(db):
+    for date in ['2024-05-01', '2024-05-20', '2024-06-03', '2024-06-04', '2024-06-05']:
+        DailyNewsletter(date=datetime.strptime(date, '%Y-%m-%d'), sections=[], generated_title=date).save()
+
+def dates(result):
+    return [issue.date.strftime('%Y-%m-%d') for issue in result]
+
+def test_issues_before_within_window(issues):
+    assert dates(get_issues_before('2024-06-05', 3)) == ['2024-06-05', '2024-06-04', '2024-06-03']
+
+def test_issues_before_falls_back_across_gap(issues):
+    # 窗口内只有两期，长假之前的一期由回退查询补上
+    assert dates(get_issues_before('2024-06-04', 3)) == ['2024-06-04', '2024-06-03', '2024-05-20']
+
+def test_issues_before_excludes_later_issues(issues):
+    assert dates(get_issues_before('2024-05-20', 3)) == ['2024-05-20', '2024-05-01']
+
+def test_issues_before_complete_only(issues):
+    DailyNewsletter.objects(date=datetime(2024, 6, 5)).update_one(set__status='partial')
+    assert dates(get_issues_before('2024-06-05', 2, complete_only=True)) == ['2024-06-04', '2024-06-03']
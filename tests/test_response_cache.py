@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+import pytest
+from api.models.article import DailyNewsletter
+from api.models.lease import GenerationLease
+from api.services.latest_issue import clear_latest_cache
+from api.services.response_cache import MISSING, ResponseCache, newsletter_cache
+
+def make_cache(max_bytes=1000, revalidate_seconds=60, version=1):
+    versions = {'current': version}
+    cache = ResponseCache(lambda key: versions['current'], max_bytes=max_bytes, revalidate_seconds=revalidate_seconds)
+    return cache, versions
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache, _ = make_cache(max_bytes=1000)
+    cache.set('a', b'a' * 400, version=1)
+    cache.set('b', b'b' * 400, version=1)
+    assert cache.get('a')
+    cache.set('c', b'c' * 400, version=1)
+
+    assert cache.get('b') is None
+    assert cache.get('a').body == b'a' * 400
+    assert cache.get('c').body == b'c' * 400
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] == 800
+    assert stats['entries'] == 2
+
+def test_replacing_an_entry_updates_size():
+    cache, _ = make_cache()
+    cache.set('a', b'a' * 400, version=1)
+    cache.set('a', b'a' * 100, version=1)
+    assert cache.stats()['bytes'] == 100
+
+def test_oversized_entry_is_returned_but_not_stored():
+    cache, _ = make_cache(max_bytes=100)
+    entry = cache.set('a', b'a' * 200, version=1)
+    assert entry.body == b'a' * 200
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 0
+
+def test_precompressed_variants_count_towards_size():
+    cache, _ = make_cache(max_bytes=10 ** 6)
+    body = b'{"title":"tldr"}' * 200
+    entry = cache.set('a', body, version=1)
+    assert 'gzip' in entry.variants
+    assert cache.stats()['bytes'] == len(body) + sum(len(v) for v in entry.variants.values())
+
+def test_etag_depends_on_content_only():
+    cache, _ = make_cache()
+    assert cache.set('a', b'same', version=1).etag == cache.set('b', b'same', version=2).etag
+    assert cache.set('a', b'same', version=1).etag != cache.set('a', b'other', version=1).etag
+
+def test_revalidation_drops_entries_with_a_new_version():
+    cache, versions = make_cache(revalidate_seconds=0)
+    cache.set('a', b'body', version=1)
+    assert cache.get('a')
+    versions['current'] = 2
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+def test_revalidation_drops_missing_documents():
+    cache, versions = make_cache(revalidate_seconds=0)
+    cache.set('a', b'body', version=1)
+    versions['current'] = MISSING
+    assert cache.get('a') is None
+
+def test_revalidation_failure_keeps_serving_cached_entry():
+    def load_version(key):
+        raise RuntimeError('database unavailable')
+
+    cache = ResponseCache(load_version, max_bytes=1000, revalidate_seconds=0)
+    cache.set('a', b'body', version=1)
+    assert cache.get('a').body == b'body'
+
+def test_invalidate():
+    cache, _ = make_cache()
+    cache.set('a', b'body', version=1)
+    cache.invalidate('a')
+    assert cache.get('a') is None
+    assert cache.stats()['invalidations'] == 1
+    assert cache.stats()['bytes'] == 0
+
+@pytest.fixture
+def client(app, db):
+    newsletter_cache.clear()
+    clear_latest_cache()
+    now = datetime.utcnow()
+    DailyNewsletter(date=datetime(2024, 6, 3), sections=[], generated_title='往期', updated_at=now).save()
+    DailyNewsletter(date=datetime(2024, 6, 4), sections=[], generated_title='采集中', status='partial', updated_at=now).save()
+    # 另一个进程仍在生成 2024-06-04，部分发布的内容直接返回
+    GenerationLease(key='newsletter:2024-06-04', owner='other', expires_at=now + timedelta(minutes=5)).save()
+    yield app.test_client()
+    newsletter_cache.clear()
+
+def test_newsletter_has_strong_etag_and_answers_304(client):
+    resp = client.get('/api/newsletter/2024-06-03')
+    assert resp.status_code == 200
+    assert resp.get_json()['generated_title'] == '往期'
+    assert 'immutable' in resp.headers['Cache-Control']
+    etag = resp.headers['ETag']
+    assert not etag.startswith('W/')
+
+    # 第二次从响应缓存返回，ETag 不变
+    assert client.get('/api/newsletter/2024-06-03').headers['ETag'] == etag
+    resp = client.get('/api/newsletter/2024-06-03', headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert resp.data == b''
+
+def test_unnormalized_date_shares_the_cached_response(client):
+    etag = client.get('/api/newsletter/2024-06-03').headers['ETag']
+    resp = client.get('/api/newsletter/2024-6-3', headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+
+def test_stale_etag_gets_full_response(client):
+    resp = client.get('/api/newsletter/2024-06-03', headers={'If-None-Match': '"stale"'})
+    assert resp.status_code == 200
+    assert resp.get_json()['generated_title'] == '往期'
+
+def test_partial_issue_is_not_cached(client):
+    resp = client.get('/api/newsletter/2024-06-04')
+    assert resp.status_code == 200
+    assert resp.get_json()['status'] == 'partial'
+    assert 'ETag' not in resp.headers
+    assert resp.headers['Cache-Control'] == 'public, max-age=10'
+    assert newsletter_cache.get('2024-06-04') is None
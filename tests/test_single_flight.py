@@ -0,0 +1,180 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from api.models.lease import GenerationLease
+from api.services import single_flight
+from api.services.single_flight import (
+    acquire_lease,
+    keep_alive,
+    lease_state,
+    release_lease,
+    renew_lease,
+    run_single_flight
+)
+
+KEY = 'newsletter:2024-06-04'
+
+def insert_lease(owner, expires_in):
+    GenerationLease._get_collection().insert_one({
+        'key': KEY,
+        'owner': owner,
+        'acquired_at': datetime.utcnow(),
+        'expires_at': datetime.utcnow() + timedelta(seconds=expires_in)
+    })
+
+def lease_doc():
+    return GenerationLease._get_collection().find_one({'key': KEY})
+
+@pytest.fixture(autouse=True)
+def fast_polling(db, monkeypatch):
+    monkeypatch.setattr(single_flight, 'POLL_INTERVAL', 0.02)
+
+def test_acquire_lease_is_exclusive():
+    assert acquire_lease(KEY)
+    assert not acquire_lease(KEY)
+    assert lease_state(KEY) == 'active'
+
+def test_expired_lease_can_be_taken_over():
+    insert_lease('other', -1)
+    assert lease_state(KEY) == 'expired'
+    assert acquire_lease(KEY)
+    assert lease_doc()['owner'] == single_flight.OWNER_ID
+
+def test_renew_lease_extends_own_lease_only():
+    assert acquire_lease(KEY, seconds=1)
+    before = lease_doc()['expires_at']
+    assert renew_lease(KEY, seconds=60)
+    assert lease_doc()['expires_at'] > before
+
+    GenerationLease._get_collection().update_one({'key': KEY}, {'$set': {'owner': 'other'}})
+    assert not renew_lease(KEY)
+
+def test_release_lease_keeps_other_owners_lease():
+    insert_lease('other', 60)
+    release_lease(KEY)
+    assert lease_state(KEY) == 'active'
+
+    GenerationLease._get_collection().delete_many({})
+    assert acquire_lease(KEY)
+    release_lease(KEY)
+    assert lease_state(KEY) == 'released'
+
+def test_concurrent_calls_share_one_generation():
+    calls = []
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def generate():
+        calls.append(1)
+        started.set()
+        proceed.wait(2)
+        return {'generated_title': 'once'}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(run_single_flight(KEY, generate, lambda: None)))
+    leader.start()
+    assert started.wait(2)
+    followers = [
+        threading.Thread(target=lambda: results.append(run_single_flight(KEY, generate, lambda: None)))
+        for _ in range(3)
+    ]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    proceed.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert results == [{'generated_title': 'once'}] * 4
+    assert lease_state(KEY) == 'released'
+
+def test_generation_error_reaches_joined_callers():
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def generate():
+        started.set()
+        proceed.wait(2)
+        raise RuntimeError('boom')
+
+    errors = []
+
+    def call():
+        try:
+            run_single_flight(KEY, generate, lambda: None)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert started.wait(2)
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.05)
+    proceed.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert errors == ['boom', 'boom']
+    assert lease_state(KEY) == 'released'
+
+def test_waits_for_result_from_other_worker():
+    insert_lease('other', 60)
+    polls = []
+
+    def load_existing():
+        polls.append(1)
+        return {'generated_title': 'theirs'} if len(polls) >= 3 else None
+
+    def generate():
+        raise AssertionError('must not generate while another worker holds the lease')
+
+    assert run_single_flight(KEY, generate, load_existing, wait_seconds=2) == {'generated_title': 'theirs'}
+
+def test_takes_over_expired_lease_from_crashed_worker():
+    insert_lease('other', 0.1)
+    assert run_single_flight(KEY, lambda: 'mine', lambda: None, wait_seconds=2) == 'mine'
+
+def test_gives_up_when_other_worker_released_without_result():
+    insert_lease('other', 60)
+    threading.Timer(0.1, lambda: GenerationLease._get_collection().delete_many({})).start()
+    assert run_single_flight(KEY, lambda: 'mine', lambda: None, wait_seconds=2) is None
+
+def test_times_out_waiting_for_other_worker():
+    insert_lease('other', 60)
+    assert run_single_flight(KEY, lambda: 'mine', lambda: None, wait_seconds=0.1) is None
+
+def test_lease_is_renewed_while_generating(monkeypatch):
+    monkeypatch.setattr(single_flight, 'LEASE_RENEW_SECONDS', 0.05)
+    expirations = []
+
+    def generate():
+        expirations.append(lease_doc()['expires_at'])
+        time.sleep(0.3)
+        expirations.append(lease_doc()['expires_at'])
+        return 'done'
+
+    assert run_single_flight(KEY, generate, lambda: None) == 'done'
+    assert expirations[1] > expirations[0]
+
+def test_keep_alive_stops_after_lease_is_lost():
+    renewals = []
+
+    def renew():
+        renewals.append(1)
+        return False
+
+    with keep_alive(renew, 0.02, KEY):
+        time.sleep(0.2)
+    assert renewals == [1]
+
+def test_keep_alive_stops_when_block_exits():
+    renewals = []
+    with keep_alive(lambda: renewals.append(1) or True, 0.02, KEY):
+        time.sleep(0.1)
+    count = len(renewals)
+    time.sleep(0.1)
+    assert count > 0
+    assert len(renewals) == count
@@ -0,0 +1,64 @@
+"""
+后台采集 worker
+与 run.py 并列运行：python worker.py
+- 领取 ingest_jobs 队列中的任务并生成对应日期的简报
+- 内置调度器，定期检查今天的简报是否已发布，发布后立即入库
+"""
+import logging
+import os
+import signal
+import time
+from run import app
+from api.services.jobs import claim_next_job, finish_job, job_lease, schedule_today
+from api.services.newsletter import generate_newsletter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 队列为空时的轮询间隔（秒）
+POLL_SECONDS = float(os.environ.get('INGEST_POLL_SECONDS', 5))
+# 调度器检查今天简报的间隔（秒）
+SCHEDULE_SECONDS = float(os.environ.get('INGEST_SCHEDULE_SECONDS', 300))
+
+_running = True
+
+def _stop(signum, frame):
+    global _running
+    logger.info(f"Received signal {signum}, stopping after current job")
+    _running = False
+
+def run_job(job):
+    try:
+        with job_lease(job):
+            result = generate_newsletter(job.date)
+        finish_job(job, 'done' if result else 'empty')
+    except Exception as e:
+        logger.error(f"Ingest job for {job.date} failed: {str(e)}")
+        finish_job(job, 'failed', str(e))
+
+def main():
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    
+    next_schedule = 0
+    with app.app_context():
+        logger.info("Ingest worker started")
+        while _running:
+            try:
+                if time.monotonic() >= next_schedule:
+                    schedule_today()
+                    next_schedule = time.monotonic() + SCHEDULE_SECONDS
+                    
+                job = claim_next_job()
+                if job:
+                    logger.info(f"Running ingest job for {job.date} (attempt {job.attempts})")
+                    run_job(job)
+                    continue
+            except Exception as e:
+                logger.error(f"Worker loop error: {str(e)}")
+                
+            time.sleep(POLL_SECONDS)
+        logger.info("Ingest worker stopped")
+
+if __name__ == '__main__':
+    main()